@@ -0,0 +1,432 @@
+"""Benchmarks for the Titanic pipeline stages on synthetic passenger manifests.
+
+Usage:
+    python benchmark.py csv --rows 1000000 10000000
+    python benchmark.py preprocess --rows 1000000
+    python benchmark.py features --rows 1000000
+    python benchmark.py imputation --rows 100000 1000000 4000000
+    python benchmark.py knn --rows 100000 1000000
+    python benchmark.py warmstart --rows 1000000 --append 10000
+    python benchmark.py tuning --rows 20000 --workers 4
+    python benchmark.py cv --rows 1000000 --workers 1 2 4
+    python benchmark.py streaming --rows 1000000 --chunk-mb 4
+    python benchmark.py registry --rows 1000000
+    python benchmark.py engines --rows 10000 100000 1000000
+    python benchmark.py partitioned --rows 1000000 --chunk-mb 16
+"""
+import argparse
+import io
+import logging
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+# Importing the app outside `streamlit run` executes it in bare mode; keep its warnings quiet.
+warnings.filterwarnings("ignore")
+logging.disable(logging.WARNING)
+import streamlit_app as app  # noqa: E402
+
+
+class BenchFile(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def synthetic_manifest(n_rows, seed=0):
+    """Builds a Titanic-shaped passenger manifest with `n_rows` rows."""
+    rng = np.random.default_rng(seed)
+    sex = rng.choice(np.array(['male', 'female']), n_rows)
+    titles = np.where(sex == 'male',
+                      rng.choice(np.array(['Mr', 'Master', 'Dr', 'Rev']), n_rows, p=[.85, .1, .03, .02]),
+                      rng.choice(np.array(['Mrs', 'Miss']), n_rows))
+    surnames = rng.choice(np.array(['Smith', 'Brown', 'Kelly', 'Andersson', 'Sage']), n_rows)
+    ticket_prefix = rng.choice(np.array(['', 'PC ', 'A/5 ', 'STON/O2. ']), n_rows, p=[.7, .1, .1, .1])
+    cabin = np.char.add(rng.choice(np.array(list('ABCDEFG')), n_rows),
+                        rng.integers(1, 130, n_rows).astype(str)).astype(object)
+    cabin[rng.random(n_rows) < 0.77] = None
+    return pd.DataFrame({
+        'PassengerId': np.arange(1, n_rows + 1),
+        'Survived': rng.integers(0, 2, n_rows),
+        'Pclass': rng.choice([1, 2, 3], n_rows, p=[.24, .21, .55]),
+        'Name': pd.Series(surnames, dtype=object) + ', ' + titles + '. John',
+        'Sex': sex,
+        'Age': np.where(rng.random(n_rows) < 0.2, np.nan, rng.uniform(0.4, 80, n_rows).round(1)),
+        'SibSp': rng.integers(0, 6, n_rows),
+        'Parch': rng.integers(0, 5, n_rows),
+        'Ticket': pd.Series(ticket_prefix, dtype=object) + rng.integers(1000, 400000, n_rows).astype(str),
+        'Fare': rng.gamma(1.5, 22, n_rows).round(4),
+        'Cabin': cabin,
+        'Embarked': rng.choice(np.array(['S', 'C', 'Q']), n_rows, p=[.72, .19, .09]),
+    })
+
+
+def parsed_manifest(n_rows, seed=0):
+    """Returns a synthetic manifest as the CSV readers would: projected and parsed to the pinned schema."""
+    return app.apply_compact_dtypes(synthetic_manifest(n_rows, seed)[app.PIPELINE_COLUMNS], app.PARSE_DTYPES)
+
+
+def loaded_manifest(n_rows, seed=0):
+    """Returns a synthetic manifest as `load_data` would: projected, engineered, validated and downcast."""
+    df, _ = app.validate_frame(app.engineer_features(parsed_manifest(n_rows, seed)), True, 'train.csv')
+    return app.optimize_dtypes(df)[0]
+
+
+def synthetic_csv(n_rows, seed=0):
+    """Returns a synthetic manifest serialized as CSV, wrapped like an upload."""
+    buffer = io.BytesIO()
+    synthetic_manifest(n_rows, seed).to_csv(buffer, index=False)
+    return BenchFile(buffer.getvalue(), 'train.csv')
+
+
+def timed(func, repeat):
+    """Returns the best wall time of `repeat` calls in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_csv(args):
+    """Compares the CSV parsing backends of `read_csv`."""
+    backends = ['c', 'processes'] + (['pyarrow'] if app.pa is not None else [])
+    print(f"{'rows':>12} {'MB':>8} " + ''.join(f"{backend:>12}" for backend in backends))
+    for n_rows in args.rows:
+        file = synthetic_csv(n_rows)
+        times = [timed(lambda: app.read_csv(file, columns=app.PIPELINE_COLUMNS, backend=backend), args.repeat)
+                 for backend in backends]
+        print(f"{n_rows:>12,} {file.size / 1024 ** 2:>8.1f} " + ''.join(f"{t:>11.2f}s" for t in times))
+    print(f"workers: {app.CSV_WORKERS}")
+
+
+def bench_preprocess(args):
+    """Times `TitanicPreprocessor.transform` and checks its peak allocation against the input size."""
+    df = loaded_manifest(args.rows)
+    preprocessor = app.TitanicPreprocessor().fit(df)
+    input_bytes = df.memory_usage(index=False, deep=True).sum()
+
+    seconds = timed(lambda: preprocessor.transform(df), args.repeat)
+    tracemalloc.start()
+    preprocessor.transform(df)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ratio = peak_bytes / input_bytes
+    print(f"rows: {args.rows:,}  transform: {seconds:.3f}s ({args.rows / seconds:,.0f} rows/s)")
+    print(f"input: {input_bytes / 1024 ** 2:.1f} MB  peak allocation: {peak_bytes / 1024 ** 2:.1f} MB ({ratio:.2f}x)")
+    if ratio > args.max_ratio:
+        sys.exit(f"FAIL: peak allocation {ratio:.2f}x exceeds {args.max_ratio}x of the input")
+
+
+def bench_features(args):
+    """Times `engineer_features` on freshly parsed rows and checks its throughput."""
+    df = parsed_manifest(args.rows)
+    seconds = timed(lambda: app.engineer_features(df), args.repeat)
+    rate = args.rows / seconds
+    engineered = app.engineer_features(df)
+    print(f"rows: {args.rows:,}  engineer_features: {seconds:.3f}s ({rate:,.0f} rows/s, "
+          f"pyarrow kernels: {app.pa is not None})")
+    for column in app.ENGINEERED_CATEGORIES:
+        print(f"  {column}: {len(engineered[column].cat.categories)} distinct")
+    if rate < args.min_rate:
+        sys.exit(f"FAIL: {rate:,.0f} rows/s is below {args.min_rate:,.0f} rows/s")
+
+
+def bench_imputation(args):
+    """Times fitting the Age group medians and imputing with them, and checks the cost grows linearly."""
+    print(f"{'rows':>12} {'groups':>8} {'fit':>9} {'impute':>9} {'ns/row':>8}")
+    rates = []
+    for n_rows in args.rows:
+        df = loaded_manifest(n_rows)
+        preprocessor = app.TitanicPreprocessor().fit(df)
+        fit = timed(lambda: app.age_group_medians(df, app.AGE_GROUP_COLUMNS), args.repeat)
+        impute = timed(lambda: preprocessor.impute(df, 'Age'), args.repeat)
+        rates.append(n_rows / (fit + impute))
+        print(f"{n_rows:>12,} {len(preprocessor.age_group_medians_):>8} {fit:>8.3f}s {impute:>8.3f}s "
+              f"{(fit + impute) / n_rows * 1e9:>8.1f}")
+    if rates[-1] < rates[0] / args.max_slowdown:
+        sys.exit(f"FAIL: throughput fell from {rates[0]:,.0f} to {rates[-1]:,.0f} rows/s")
+
+
+def bench_knn(args):
+    """Times the KNN imputer's KD-tree build and batched queries against brute-force neighbour search."""
+    from sklearn.neighbors import NearestNeighbors
+
+    print(f"{'rows':>12} {'indexed':>10} {'queries':>10} {'build':>9} {'query':>9} {'brute':>9}")
+    for n_rows in args.rows:
+        df = loaded_manifest(n_rows)
+        preprocessor = app.TitanicPreprocessor(imputer='knn').fit(df)
+        imputer = preprocessor.knn_imputers_['Age']
+        missing = df['Age'].isna().to_numpy()
+        rows = app.knn_matrix(df.loc[missing, app.KNN_FEATURES], {'Fare': preprocessor.fare_median_})
+        build = timed(lambda: imputer.fit(preprocessor.knn_sample_.rows), args.repeat)
+        query = timed(lambda: imputer.predict(rows), args.repeat)
+        brute = '-'
+        if n_rows <= args.brute_max_rows:
+            index = NearestNeighbors(n_neighbors=imputer.k, algorithm='brute').fit(imputer.tree_.get_arrays()[0])
+            features = (rows[:, imputer.features_] - imputer.center_) / imputer.scale_
+            brute = f"{timed(lambda: index.kneighbors(features), args.repeat):>8.3f}s"
+        print(f"{n_rows:>12,} {len(imputer.values_):>10,} {len(rows):>10,} {build:>8.3f}s {query:>8.3f}s {brute:>9}")
+
+
+def bench_warmstart(args):
+    """Refits after `--append` rows are appended, cold and warm-started from the earlier fit."""
+    df = loaded_manifest(args.rows + args.append)
+    preprocessor = app.TitanicPreprocessor().fit(df)
+    features = app.build_feature_matrix(preprocessor.transform(df))
+    parent = features._replace(X=features.X[:args.rows], passenger_id=features.passenger_id[:args.rows],
+                               y=features.y[:args.rows])
+    state = app.warm_start_state(app.train_model(parent)[0], parent.columns)
+
+    print(f"rows: {args.rows:,} + {args.append:,} appended")
+    for label, warm_start in [('cold', None), ('warm', state)]:
+        seconds = timed(lambda: app.train_model(features, warm_start), args.repeat)
+        iterations = app.train_model(features, warm_start)[0].n_iter_[0]
+        print(f"  {label}: {iterations:>5} iterations {seconds:>8.3f}s")
+
+
+def bench_tuning(args):
+    """Times a cold hyperparameter search, a rerun, and a search over a wider C grid."""
+    app.CACHE_DIR = Path(tempfile.mkdtemp(prefix='titanic-bench-'))
+    df = loaded_manifest(args.rows)
+    features = app.build_feature_matrix(app.TitanicPreprocessor().fit(df).transform(df))
+    app.save_matrix('bench', 'train_features', features)
+    solvers = list(app.TUNING_SOLVERS)
+    print(f"rows: {args.rows:,}  workers: {args.workers}")
+    for label, c_values in [('cold', app.DEFAULT_TUNING_C_VALUES), ('rerun', app.DEFAULT_TUNING_C_VALUES),
+                            ('wider C grid', app.TUNING_C_VALUES)]:
+        start = time.perf_counter()
+        params, leaderboard, counts = app.tune_hyperparameters('bench', features, c_values, solvers, args.workers)
+        print(f"  {label:<14} {time.perf_counter() - start:>7.2f}s  {len(leaderboard):>3} candidates  "
+              f"{counts['trained fits']:>4} trained  {counts['cached fits']:>4} cached  best {params}")
+    shutil.rmtree(app.CACHE_DIR, ignore_errors=True)
+
+
+def bench_cv(args):
+    """Times k-fold cross-validation with different worker counts; ideal scaling is linear up to k."""
+    app.CACHE_DIR = Path(tempfile.mkdtemp(prefix='titanic-bench-'))
+    df = loaded_manifest(args.rows)
+    features = app.build_feature_matrix(app.TitanicPreprocessor().fit(df).transform(df))
+    app.save_matrix('bench', 'train_features', features)
+    model = app.train_model(features)[0]
+    print(f"rows: {args.rows:,}  folds: {app.CV_FOLDS}  cores: {app.CV_WORKERS}")
+    baseline = None
+    for workers in args.workers:
+        seconds = timed(lambda: app.cross_validate_model('bench', model, features, workers), args.repeat)
+        baseline = baseline or seconds
+        print(f"  {workers:>3} worker(s) {seconds:>8.2f}s  speedup {baseline / seconds:>5.2f}x")
+    shutil.rmtree(app.CACHE_DIR, ignore_errors=True)
+
+
+def bench_streaming(args):
+    """Compares the streaming SGD trainer with in-memory LogisticRegression by time, peak heap and accuracy.
+
+    Both read the same stored, memory-mapped matrix; the heap counts what training allocates on top.
+    """
+    app.CACHE_DIR = Path(tempfile.mkdtemp(prefix='titanic-bench-'))
+    df = loaded_manifest(args.rows)
+    app.save_matrix('bench', 'train_features', app.build_feature_matrix(app.TitanicPreprocessor().fit(df).transform(df)))
+    del df
+    features = app.load_matrix('bench', 'train_features')
+    print(f"rows: {args.rows:,}  matrix: {features.X.nbytes / 1024 ** 2:.1f} MB  chunk budget: {args.chunk_mb} MB")
+    results = {}
+
+    def in_memory():
+        model, X_test, y_test = app.train_model(features)
+        results['in memory'] = model.score(X_test, y_test)
+
+    def streaming():
+        results['streaming'] = app.train_streaming('bench', features, args.chunk_mb,
+                                                   checkpoint_name=f"bench-{time.time_ns()}")[1]['accuracy']
+
+    for label, func in [('in memory', in_memory), ('streaming', streaming)]:
+        seconds, peak_bytes = traced(func)
+        print(f"  {label:<10} {seconds:>7.2f}s  peak heap {peak_bytes / 1024 ** 2:>8.1f} MB  "
+              f"held-out accuracy {results[label]:.4f}")
+    shutil.rmtree(app.CACHE_DIR, ignore_errors=True)
+
+
+def bench_registry(args):
+    """Trains each trainer once through the model registry, then loads it as a restarted server would."""
+    app.CACHE_DIR = Path(tempfile.mkdtemp(prefix='titanic-bench-'))
+    df = loaded_manifest(args.rows)
+    preprocessor = app.TitanicPreprocessor().fit(df)
+    app.save_matrix('bench', 'train_features', app.build_feature_matrix(preprocessor.transform(df)))
+    del df
+    features = app.load_matrix('bench', 'train_features')
+
+    def in_memory():
+        model, X_test, y_test = app.train_model(features)
+        return model, y_test, model.predict(X_test)
+
+    trainers = {
+        'in-memory': (None, in_memory),
+        'streaming': ({'epochs': app.STREAMING_EPOCHS}, lambda: app.train_streaming('bench', features)[0]),
+    }
+    print(f"rows: {args.rows:,}")
+    for trainer, (params, train) in trainers.items():
+        (model, _, _), _, trained = app.ModelRegistry().train('bench', trainer, params, preprocessor, features, train)
+        (loaded, _, _), entry, report = app.ModelRegistry().train('bench', trainer, params, preprocessor, features, train)
+        size = (app.CACHE_DIR / app.REGISTRY_KEY / f"{report['name']}.pkl").stat().st_size
+        sample = features.X[:10_000]
+        identical = np.array_equal(model.predict_proba(sample), loaded.predict_proba(sample))
+        print(f"  {trainer:<10} trained {trained['seconds']:>7.3f}s  loaded {report['seconds'] * 1000:>7.2f} ms  "
+              f"entry {size / 1024:>5.1f} KB  identical predictions: {identical}")
+    shutil.rmtree(app.CACHE_DIR, ignore_errors=True)
+
+
+def engine_features(engine, train_file, test_file):
+    """Runs loading and preprocessing as `run_pipeline` does and returns both feature matrices."""
+    train_df, test_df, _, _ = app.load_data(train_file, test_file, app.PIPELINE_COLUMNS, 'c', engine)
+    train_df, test_df = app.optimize_dtypes(train_df)[0], app.optimize_dtypes(test_df)[0]
+    preprocessor = app.TitanicPreprocessor(engine=engine).fit(train_df)
+    return [app.build_feature_matrix(preprocessor.transform(df)) for df in (train_df, test_df)]
+
+
+def bench_engines(args):
+    """Times the dataframe engines end to end, checks they agree and suggests the 'auto' threshold."""
+    engines = ['pandas'] + (['polars'] if app.pl is not None else [])
+    print(f"{'rows':>12} {'MB':>8} " + ''.join(f"{engine:>12}" for engine in engines))
+    threshold = None
+    for n_rows in args.rows:
+        train_file, test_file = synthetic_csv(n_rows), synthetic_csv(n_rows // 2, seed=1)
+        matrices = {engine: engine_features(engine, train_file, test_file) for engine in engines}
+        for engine in engines[1:]:
+            if not all(np.array_equal(a.X, b.X) for a, b in zip(matrices['pandas'], matrices[engine])):
+                sys.exit(f"FAIL: the {engine} engine produced a different feature matrix")
+        times = {engine: timed(lambda: engine_features(engine, train_file, test_file), args.repeat)
+                 for engine in engines}
+        size = train_file.size + test_file.size
+        if threshold is None and len(engines) > 1 and times['polars'] < times['pandas']:
+            threshold = size
+        print(f"{n_rows:>12,} {size / 1024 ** 2:>8.1f} " + ''.join(f"{times[e]:>11.2f}s" for e in engines))
+    print(f"POLARS_THRESHOLD_BYTES: {app.POLARS_THRESHOLD_BYTES / 1024 ** 2:.0f} MB, polars first faster at: "
+          + ("-" if threshold is None else f"{threshold / 1024 ** 2:.1f} MB"))
+
+
+def traced(func):
+    """Returns the wall time and the peak Python heap allocation of one call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak_bytes
+
+
+def bench_partitioned(args):
+    """Compares in-memory and out-of-core preprocessing by wall time and peak heap.
+
+    Workers are separate processes that tracemalloc cannot see, so the heap is measured
+    with a single worker; the timing row uses all cores.
+    """
+    train_file, test_file = synthetic_csv(args.rows), synthetic_csv(args.rows // 2, seed=1)
+    app.CACHE_DIR = Path(tempfile.mkdtemp(prefix='titanic-bench-'))
+
+    def in_memory():
+        train_df, test_df, _, _ = app.load_data(train_file, test_file, app.PIPELINE_COLUMNS, 'c')
+        preprocessor = app.TitanicPreprocessor().fit(train_df)
+        return [app.build_feature_matrix(preprocessor.transform(df)) for df in (train_df, test_df)]
+
+    def partitioned(workers):
+        key = f"{workers}-{time.perf_counter_ns()}"
+        app.ingest_partitioned(key, train_file, test_file, args.chunk_mb, workers)
+
+    print(f"rows: {args.rows:,}  upload: {(train_file.size + test_file.size) / 1024 ** 2:.1f} MB  "
+          f"chunk budget: {args.chunk_mb} MB")
+    for label, func in [('in memory', in_memory), ('partitioned, 1 worker', lambda: partitioned(1))]:
+        seconds, peak_bytes = traced(func)
+        print(f"  {label:<28} {seconds:>7.2f}s  peak heap {peak_bytes / 1024 ** 2:>8.1f} MB")
+    seconds = timed(lambda: partitioned(app.PARTITION_WORKERS), 1)
+    print(f"  {f'partitioned, {app.PARTITION_WORKERS} worker(s)':<28} {seconds:>7.2f}s")
+    shutil.rmtree(app.CACHE_DIR, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    csv_parser = subparsers.add_parser('csv', help="CSV parsing backends")
+    csv_parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    csv_parser.add_argument('--repeat', type=int, default=1)
+    csv_parser.set_defaults(func=bench_csv)
+
+    preprocess_parser = subparsers.add_parser('preprocess', help="preprocessing throughput and peak memory")
+    preprocess_parser.add_argument('--rows', type=int, default=1_000_000)
+    preprocess_parser.add_argument('--repeat', type=int, default=3)
+    preprocess_parser.add_argument('--max-ratio', type=float, default=1.2)
+    preprocess_parser.set_defaults(func=bench_preprocess)
+
+    features_parser = subparsers.add_parser('features', help="feature engineering throughput")
+    features_parser.add_argument('--rows', type=int, default=1_000_000)
+    features_parser.add_argument('--repeat', type=int, default=3)
+    features_parser.add_argument('--min-rate', type=float, default=1_000_000)
+    features_parser.set_defaults(func=bench_features)
+
+    imputation_parser = subparsers.add_parser('imputation', help="group-aware Age imputation scaling")
+    imputation_parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000, 4_000_000])
+    imputation_parser.add_argument('--repeat', type=int, default=3)
+    imputation_parser.add_argument('--max-slowdown', type=float, default=2)
+    imputation_parser.set_defaults(func=bench_imputation)
+
+    knn_parser = subparsers.add_parser('knn', help="KNN imputer index build and query times")
+    knn_parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    knn_parser.add_argument('--repeat', type=int, default=1)
+    knn_parser.add_argument('--brute-max-rows', type=int, default=100_000)
+    knn_parser.set_defaults(func=bench_knn)
+
+    warmstart_parser = subparsers.add_parser('warmstart', help="cold vs. warm-started refits after an append")
+    warmstart_parser.add_argument('--rows', type=int, default=1_000_000)
+    warmstart_parser.add_argument('--append', type=int, default=10_000)
+    warmstart_parser.add_argument('--repeat', type=int, default=3)
+    warmstart_parser.set_defaults(func=bench_warmstart)
+
+    tuning_parser = subparsers.add_parser('tuning', help="hyperparameter search with memoized results")
+    tuning_parser.add_argument('--rows', type=int, default=20_000)
+    tuning_parser.add_argument('--workers', type=int, default=app.TUNING_WORKERS)
+    tuning_parser.set_defaults(func=bench_tuning)
+
+    cv_parser = subparsers.add_parser('cv', help="parallel k-fold cross-validation scaling")
+    cv_parser.add_argument('--rows', type=int, default=1_000_000)
+    cv_parser.add_argument('--workers', type=int, nargs='+', default=[1, app.CV_WORKERS])
+    cv_parser.add_argument('--repeat', type=int, default=1)
+    cv_parser.set_defaults(func=bench_cv)
+
+    streaming_parser = subparsers.add_parser('streaming', help="streaming SGD vs. in-memory training")
+    streaming_parser.add_argument('--rows', type=int, default=1_000_000)
+    streaming_parser.add_argument('--chunk-mb', type=float, default=4)
+    streaming_parser.set_defaults(func=bench_streaming)
+
+    registry_parser = subparsers.add_parser('registry', help="training vs. loading from the model registry")
+    registry_parser.add_argument('--rows', type=int, default=1_000_000)
+    registry_parser.set_defaults(func=bench_registry)
+
+    engines_parser = subparsers.add_parser('engines', help="pandas vs. Polars loading and preprocessing")
+    engines_parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    engines_parser.add_argument('--repeat', type=int, default=1)
+    engines_parser.set_defaults(func=bench_engines)
+
+    partitioned_parser = subparsers.add_parser('partitioned', help="in-memory vs. out-of-core preprocessing")
+    partitioned_parser.add_argument('--rows', type=int, default=1_000_000)
+    partitioned_parser.add_argument('--chunk-mb', type=float, default=16)
+    partitioned_parser.set_defaults(func=bench_partitioned)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,50 @@ import pandas as pd
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split, StratifiedKFold
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import make_pipeline
+from sklearn.neighbors import KDTree
+from sklearn.exceptions import ConvergenceWarning
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix, roc_auc_score
 import io
+import os
+import re
+import bz2
+import gzip
+import json
+import time
+import warnings
+import shutil
+import copy
+import pickle
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from collections import namedtuple
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute
+    import pyarrow.csv
+    import pyarrow.ipc
+    import pyarrow.feather
+    import pyarrow.parquet
+except ImportError:  # Columnar uploads need pyarrow; CSV ingestion works without it.
+    pa = None
+
+try:
+    import polars as pl
+except ImportError:  # Only needed for the Polars engine.
+    pl = None
+
+try:
+    import zstandard
+except ImportError:  # Only needed for .csv.zst uploads.
+    zstandard = None
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -16,54 +56,2209 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# --- Ingestion Settings ---
+DEFAULT_CHUNK_MB = 64
+SAMPLE_BYTES = 64 * 1024
+STREAM_BLOCK_BYTES = 1024 * 1024
+# Parsed DataFrames take roughly this many times the raw CSV bytes (object strings dominate).
+CSV_MEMORY_EXPANSION = 4
+UPLOAD_TYPES = ["csv", "parquet", "feather", "arrow"]
+# Compressed CSVs (e.g. train.csv.gz) are decompressed as a stream straight into the parser.
+COMPRESSION_SUFFIXES = {'gz': 'gzip', 'zst': 'zstd', 'bz2': 'bz2'}
+# Compact schema pinned at ingestion instead of the int64/float64/object defaults.
+COMPACT_DTYPES = {
+    'Pclass': 'int8',
+    'SibSp': 'int8',
+    'Parch': 'int8',
+    'Age': 'float32',
+    'Fare': 'float32',
+    'Sex': 'category',
+    'Embarked': 'category',
+    # Repeated strings: feature engineering and group counts only touch the distinct values.
+    'Ticket': 'category',
+    'Cabin': 'category',
+    'Title': 'category',
+    'Deck': 'category',
+    'TicketPrefix': 'category',
+}
+# Pinned while parsing; the int8 columns are cast after validation has quarantined rows
+# with missing or non-numeric values, which int8 cannot hold.
+PARSE_DTYPES = {col: dtype for col, dtype in COMPACT_DTYPES.items() if dtype != 'int8'}
+# Columns every upload must have (Survived only for training data).
+CORE_COLUMNS = ['PassengerId', 'Survived', 'Pclass', 'Sex', 'Age', 'SibSp', 'Parch', 'Fare', 'Embarked']
+# The only columns the pipeline reads; everything else is never parsed. The free-text columns
+# are optional and reduced to engineered categoricals right after parsing.
+PIPELINE_COLUMNS = CORE_COLUMNS + ['Name', 'Ticket', 'Cabin']
+TITLE_PATTERN = re.compile(r',\s*(?P<title>[^,.]+)\.')
+TITLE_ALIASES = {'Mlle': 'Miss', 'Ms': 'Miss', 'Mme': 'Mrs'}
+# Categoricals produced by `engineer_features`, one-hot encoded by the preprocessor.
+ENGINEERED_CATEGORIES = ['Title', 'Deck', 'TicketPrefix']
+# Titles, decks and ticket prefixes rarer than this in the training data are one-hot encoded as unknown.
+MIN_CATEGORY_COUNT = 10
+# Missing ages are filled with the training median of the passenger's group. Title only joins the
+# key when names were uploaded; rows whose group has no known age fall back to the global mean.
+AGE_GROUP_COLUMNS = ['Pclass', 'Sex', 'Title']
+# Missing-value imputers: the group medians above, or the mean over the nearest complete training rows.
+IMPUTERS = ['group', 'knn']
+KNN_NEIGHBORS = 5
+# Standardized distance features (Sex counts as 1 for male); each imputed column is matched on the others.
+KNN_FEATURES = ['Pclass', 'Sex', 'SibSp', 'Parch', 'Age', 'Fare']
+# The KD-tree indexes a uniform sample of at most this many complete training rows.
+KNN_INDEX_ROWS = 200_000
+KNN_QUERY_BATCH_ROWS = 65_536
+PROJECTION_SAMPLE_ROWS = 10_000
+# String columns with at most this ratio of distinct values to rows become categoricals.
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Compactor capacity of the streaming quantile sketch; larger is more accurate.
+QUANTILE_SKETCH_K = 2048
+STATS_CHUNK_ROWS = 100_000
+# Quarantine frames carry one boolean column per validation rule, named with this prefix.
+RULE_PREFIX = 'rule: '
+# 'auto' switches from the single-threaded C parser to a parallel backend above the threshold.
+CSV_BACKENDS = ['auto', 'c', 'pyarrow', 'processes']
+PARALLEL_CSV_THRESHOLD_BYTES = 32 * 1024 * 1024
+CSV_WORKERS = os.cpu_count() or 1
+# Imported once by the fork server that starts pool workers (missing optional ones are skipped).
+WORKER_PRELOAD_MODULES = ['numpy', 'pandas', 'matplotlib.pyplot', 'seaborn', 'streamlit',
+                          'sklearn.linear_model', 'sklearn.model_selection', 'sklearn.neighbors',
+                          'sklearn.metrics', 'pyarrow.parquet', 'polars']
+# Dataframe engine for loading and preprocessing; both produce the same frames and feature
+# matrices. 'auto' switches to Polars above the crossover measured by `benchmark.py engines`
+# on a single core; more cores only move the crossover down.
+ENGINES = ['auto', 'pandas', 'polars']
+POLARS_THRESHOLD_BYTES = 64 * 1024 * 1024
+# Out-of-core mode preprocesses one Parquet partition per chunk, spread over this many processes.
+PARTITION_WORKERS = os.cpu_count() or 1
+# The pandas default NA strings that Polars would otherwise read as values.
+POLARS_NULL_VALUES = ['NA', 'N/A', 'NaN', 'nan', 'NULL', 'null', 'None', '#N/A', '<NA>']
+
+# --- Training Settings ---
+# 'streaming' trains logistic regression by SGD over chunks of the stored matrix instead of in memory.
+TRAINERS = ['in-memory', 'streaming']
+STREAMING_EPOCHS = 5
+# The streaming model is compared with the in-memory one only for matrices up to this size.
+IN_MEMORY_COMPARISON_MAX_BYTES = 1024 ** 3
+
+# --- Tuning Settings ---
+# Hyperparameter search grid: C values times solver/penalty pairs (penalty as l1_ratio: 1 is l1, 0 is l2).
+# scikit-learn < 1.8 ignores l1_ratio without penalty='elasticnet', hence the pin in requirements.txt.
+TUNING_C_VALUES = [0.001, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0]
+DEFAULT_TUNING_C_VALUES = [0.01, 0.1, 1.0, 10.0]
+TUNING_SOLVERS = {
+    'lbfgs / l2': {'solver': 'lbfgs', 'l1_ratio': 0.0},
+    'liblinear / l1': {'solver': 'liblinear', 'l1_ratio': 1.0},
+    'liblinear / l2': {'solver': 'liblinear', 'l1_ratio': 0.0},
+    'saga / l1': {'solver': 'saga', 'l1_ratio': 1.0},
+    'saga / l2': {'solver': 'saga', 'l1_ratio': 0.0},
+}
+TUNING_FOLDS = 3
+# Successive halving: each round keeps the best 1/TUNING_FACTOR of the candidates and gives them
+# TUNING_FACTOR times the rows; the last of TUNING_ROUNDS rounds fits on whole folds.
+TUNING_FACTOR = 3
+TUNING_ROUNDS = 3
+TUNING_WORKERS = os.cpu_count() or 1
+
+# --- Evaluation Settings ---
+CV_FOLDS = 5
+CV_WORKERS = os.cpu_count() or 1
+# Scored on every cross-validation fold; the same metrics as the single-split evaluation.
+CV_METRICS = {
+    'Accuracy': accuracy_score,
+    'Precision': precision_score,
+    'Recall': recall_score,
+    'F1 Score': f1_score,
+    'ROC-AUC Score': roc_auc_score,
+}
+
+# --- Artifact Cache Settings ---
+CACHE_DIR = Path(os.environ.get("TITANIC_CACHE_DIR", ".titanic_cache"))
+# Bump whenever parsing, preprocessing or training changes so stale artifacts are not reused.
+PIPELINE_VERSION = "13"
+HASH_BLOCK_BYTES = 1024 * 1024
+# Store key (next to the dataset keys) of the last fitted coefficients of every dataset lineage.
+MODELS_KEY = 'models'
+# Store key of the model registry: fitted models by dataset key, trainer and hyperparameters.
+REGISTRY_KEY = 'registry'
+# Estimators the registry can rebuild from their parameters and fitted attributes.
+REGISTRY_ESTIMATORS = {cls.__name__: cls for cls in (LogisticRegression, SGDClassifier, StandardScaler)}
+REGISTRY_FITTED_ATTRIBUTES = ['coef_', 'intercept_', 'classes_', 'n_iter_', 'n_features_in_',
+                              'mean_', 'var_', 'scale_', 'n_samples_seen_']
+
 # --- Helper Functions (Caching for performance) ---
-@st.cache_data
-def load_data(train_file, test_file):
-    """Loads and caches the training and testing data."""
+def upload_digest(file):
+    """SHA-256 of an upload's size and bytes.
+
+    Every widget interaction reruns the script with the same upload (same `file_id`), so
+    digests are kept in the session state and each upload is read and hashed only once.
+    """
+    file_id = getattr(file, 'file_id', None)
+    digests = {} if file_id is None else st.session_state.setdefault('upload_digests', {})
+    if file_id not in digests:
+        digest = hashlib.sha256(str(file.size).encode())
+        file.seek(0)
+        for block in iter(lambda: file.read(HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+        file.seek(0)
+        digests[file_id] = digest.hexdigest()
+    return digests[file_id]
+
+def dataset_key(*files, imputer='group', partitioned=False):
+    """Content address of the uploads: their `upload_digest` plus the pipeline version, imputer
+    and preprocessing mode (partitioned preprocessing learns sketched medians)."""
+    mode = 'partitioned' if partitioned else 'in-memory'
+    digest = hashlib.sha256(f"pipeline-v{PIPELINE_VERSION}-{imputer}-{mode}".encode())
+    for file in files:
+        digest.update(upload_digest(file).encode())
+    return digest.hexdigest()
+
+def load_artifact(key, name):
+    """Returns a stored artifact, or None if it is missing or unreadable."""
+    path = CACHE_DIR / key / f"{name}.pkl"
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+def save_artifact(key, name, value):
+    """Writes an artifact atomically so concurrent sessions never read a partial file."""
+    path = CACHE_DIR / key / f"{name}.pkl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Sessions are threads of one server process, so every writer needs its own name, not just its pid.
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', prefix=f"{path.stem}.", dir=path.parent)
+    with os.fdopen(fd, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def cached_artifact(key, name, build):
+    """Loads an artifact from the on-disk store, building and storing it on a miss."""
+    value = load_artifact(key, name)
+    if value is None:
+        value = build()
+        save_artifact(key, name, value)
+    return value
+
+def save_frame(key, name, df):
+    """Stores a DataFrame as one .npy file per column so that it can be memory-mapped.
+
+    Categorical columns are stored as their integer codes plus the category list.
+    """
+    path = CACHE_DIR / key / name
+    tmp_path = make_tmp_directory(path)
+    schema = []
+    for i, (column, series) in enumerate(df.items()):
+        entry = {'name': column}
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            entry['categories'] = series.cat.categories.tolist()
+            values = series.cat.codes.to_numpy()
+        else:
+            values = series.to_numpy()
+        # Object columns cannot be mapped; they are pickled and loaded per process.
+        entry['pickled'] = values.dtype == object
+        np.save(tmp_path / f"{i}.npy", values, allow_pickle=entry['pickled'])
+        schema.append(entry)
+    (tmp_path / 'schema.json').write_text(json.dumps(schema))
+    publish_directory(tmp_path, path)
+
+def make_tmp_directory(path):
+    """Creates a scratch directory next to `path` with a name unique to this writer (see `publish_directory`)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(suffix='.tmp', prefix=f"{path.name}.", dir=path.parent))
+
+def publish_directory(tmp_path, path):
+    """Moves a fully written directory into place atomically; the first writer wins."""
+    try:
+        os.replace(tmp_path, path)
+    except OSError:  # Another session stored the same artifact first.
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def load_frame(key, name):
+    """Memory-maps a stored frame read-only, or returns None if it is not stored.
+
+    Every session and server process maps the same pages, so a dataset is resident once.
+    """
+    path = CACHE_DIR / key / name
+    try:
+        schema = json.loads((path / 'schema.json').read_text())
+    except (OSError, ValueError):
+        return None
+    columns = {}
+    for i, entry in enumerate(schema):
+        if entry['pickled']:
+            values = np.load(path / f"{i}.npy", allow_pickle=True)
+        else:
+            values = np.load(path / f"{i}.npy", mmap_mode='r')
+        if 'categories' in entry:
+            values = pd.Categorical.from_codes(values, entry['categories'])
+        columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+def cached_frames(key, names, build):
+    """Returns memory-mapped frames from the store, building and storing them on a miss.
+
+    Freshly built frames are written out and then mapped back, so the private copy is freed.
+    """
+    frames = [load_frame(key, name) for name in names]
+    if any(frame is None for frame in frames):
+        built = build()
+        if any(frame is None for frame in built):
+            return None
+        for name, frame in zip(names, built):
+            save_frame(key, name, frame)
+        frames = [load_frame(key, name) for name in names]
+    return frames
+
+def partition_paths(key, name, stage):
+    """The stored Parquet partitions of a frame ('raw' or 'processed'), in row order."""
+    return sorted((CACHE_DIR / key / 'partitions' / name / stage).glob('part-*.parquet'))
+
+def write_partition(df, path):
+    """Writes one partition as Parquet; pandas dtypes, including categoricals, round-trip."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    pa.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), path)
+
+def read_partition(path):
+    return pa.parquet.read_table(path).to_pandas()
+
+def save_frame_partitions(key, name, paths):
+    """Stores Parquet partitions as one memory-mappable frame (see `save_frame`).
+
+    Only one partition is in memory at a time: a first pass sizes the columns from the
+    Parquet metadata and the categorical columns alone (dtypes are widened to fit every
+    partition, categories are unioned in order of appearance) and a second fills them.
+    """
+    n_rows, dtypes, categories = 0, {}, {}
+    for path in paths:
+        schema = pa.parquet.read_schema(path)
+        columns = schema.names
+        categorical = [column for column in columns if pa.types.is_dictionary(schema.field(column).type)]
+        for column in columns:
+            if column not in categorical:
+                dtype = schema.field(column).type.to_pandas_dtype()
+                dtypes[column] = np.result_type(dtypes.get(column, dtype), dtype)
+        for column, series in pa.parquet.read_table(path, columns=categorical).to_pandas().items():
+            new = series.cat.categories
+            known = categories.get(column)
+            categories[column] = new if known is None else known.append(new[~new.isin(known)])
+        n_rows += pa.parquet.ParquetFile(path).metadata.num_rows
+    for column, column_categories in categories.items():
+        dtypes[column] = np.min_scalar_type(-len(column_categories) - 1)
+
+    path = CACHE_DIR / key / name
+    tmp_path = make_tmp_directory(path)
+    arrays = [np.lib.format.open_memmap(tmp_path / f"{i}.npy", mode='w+', dtype=dtypes[column], shape=(n_rows,))
+              for i, column in enumerate(columns)]
+    start = 0
+    for partition in paths:
+        df = read_partition(partition)
+        for column, array in zip(columns, arrays):
+            series = df[column]
+            if column in categories:
+                # Recode the partition's codes to the union; the trailing -1 keeps missing values.
+                lookup = np.append(categories[column].get_indexer(series.cat.categories), -1)
+                array[start:start + len(df)] = lookup[series.cat.codes.to_numpy()]
+            else:
+                array[start:start + len(df)] = series.to_numpy()
+        start += len(df)
+    for array in arrays:
+        array.flush()
+    schema = [{'name': column, 'pickled': False} for column in columns]
+    for entry in schema:
+        if entry['name'] in categories:
+            entry['categories'] = categories[entry['name']].tolist()
+    (tmp_path / 'schema.json').write_text(json.dumps(schema))
+    del arrays
+    publish_directory(tmp_path, path)
+
+def upload_compression(file):
+    """Returns the compression of a CSV upload from its extension ('gzip', 'zstd', 'bz2' or None)."""
+    return COMPRESSION_SUFFIXES.get(file.name.rsplit('.', 1)[-1].lower())
+
+def open_csv_stream(file):
+    """Rewinds the upload and returns a binary stream of its CSV text, decompressing on the fly.
+
+    Decompression is incremental, so a full decompressed copy never exists in memory.
+    """
+    file.seek(0)
+    compression = upload_compression(file)
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=file, mode='rb')
+    if compression == 'bz2':
+        return bz2.BZ2File(file, mode='rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise ImportError("Reading .zst files requires zstandard (pip install zstandard).")
+        return zstandard.ZstdDecompressor().stream_reader(file)
+    return file
+
+# Model input: a C-contiguous float32 matrix plus its column index, the passenger ids and
+# (for training data) the Survived labels.
+FeatureMatrix = namedtuple('FeatureMatrix', ['X', 'columns', 'passenger_id', 'y'])
+
+def build_feature_matrix(processed):
+    """Packs every feature column of a preprocessed frame into one float32 matrix."""
+    columns = [column for column in processed.columns if column not in ('Survived', 'PassengerId')]
+    X = np.empty((len(processed), len(columns)), dtype='float32', order='C')
+    for j, column in enumerate(columns):
+        X[:, j] = processed[column].to_numpy()
+    y = processed['Survived'].to_numpy() if 'Survived' in processed.columns else None
+    return FeatureMatrix(X, columns, processed['PassengerId'].to_numpy(), y)
+
+def save_matrix(key, name, features):
+    """Stores a FeatureMatrix as memory-mappable .npy files plus its column index."""
+    path = CACHE_DIR / key / name
+    tmp_path = make_tmp_directory(path)
+    np.save(tmp_path / 'X.npy', features.X)
+    np.save(tmp_path / 'passenger_id.npy', features.passenger_id)
+    if features.y is not None:
+        np.save(tmp_path / 'y.npy', features.y)
+    (tmp_path / 'columns.json').write_text(json.dumps(features.columns))
+    publish_directory(tmp_path, path)
+
+def load_matrix(key, name):
+    """Memory-maps a stored FeatureMatrix read-only, or returns None if it is not stored."""
+    path = CACHE_DIR / key / name
+    try:
+        columns = json.loads((path / 'columns.json').read_text())
+    except (OSError, ValueError):
+        return None
+    y = np.load(path / 'y.npy', mmap_mode='r') if (path / 'y.npy').exists() else None
+    return FeatureMatrix(np.load(path / 'X.npy', mmap_mode='r'), columns,
+                         np.load(path / 'passenger_id.npy', mmap_mode='r'), y)
+
+def save_matrix_partitions(key, name, paths):
+    """Stores the feature matrix of processed Parquet partitions, one partition in memory at a time.
+
+    The matrix is filled in place on disk, so it never has to fit in the heap.
+    """
+    metadata = [pa.parquet.ParquetFile(path) for path in paths]
+    n_rows = sum(parquet_file.metadata.num_rows for parquet_file in metadata)
+    schema = metadata[0].schema_arrow
+    columns = [column for column in schema.names if column not in ('Survived', 'PassengerId')]
+    path = CACHE_DIR / key / name
+    tmp_path = make_tmp_directory(path)
+    X = np.lib.format.open_memmap(tmp_path / 'X.npy', mode='w+', dtype='float32', shape=(n_rows, len(columns)))
+    passenger_id = np.lib.format.open_memmap(tmp_path / 'passenger_id.npy', mode='w+', dtype=np.result_type(
+        *[parquet_file.schema_arrow.field('PassengerId').type.to_pandas_dtype() for parquet_file in metadata]),
+        shape=(n_rows,))
+    y = None
+    if 'Survived' in schema.names:
+        y = np.lib.format.open_memmap(tmp_path / 'y.npy', mode='w+', dtype=np.result_type(
+            *[parquet_file.schema_arrow.field('Survived').type.to_pandas_dtype() for parquet_file in metadata]),
+            shape=(n_rows,))
+    start = 0
+    for partition in paths:
+        features = build_feature_matrix(read_partition(partition))
+        stop = start + len(features.X)
+        X[start:stop] = features.X
+        passenger_id[start:stop] = features.passenger_id
+        if y is not None:
+            y[start:stop] = features.y
+        start = stop
+    for array in (X, passenger_id, y):
+        if array is not None:
+            array.flush()
+    (tmp_path / 'columns.json').write_text(json.dumps(columns))
+    del X, passenger_id, y
+    publish_directory(tmp_path, path)
+
+def cached_matrices(key, names, build):
+    """Returns memory-mapped feature matrices from the store, building and storing them on a miss."""
+    matrices = [load_matrix(key, name) for name in names]
+    if any(matrix is None for matrix in matrices):
+        for name, matrix in zip(names, build()):
+            save_matrix(key, name, matrix)
+        matrices = [load_matrix(key, name) for name in names]
+    return matrices
+
+def estimate_row_bytes(file):
+    """Estimates the average CSV row length in bytes from a sample at the start of the file."""
+    sample = open_csv_stream(file).read(SAMPLE_BYTES)
+    file.seek(0)
+    rows = max(sample.count(b"\n") - 1, 1)
+    return len(sample) / rows
+
+def estimate_csv_rows(file):
+    """Estimates the number of data rows: from the byte size for plain CSVs, or by counting
+    newlines in a decompression stream for compressed ones."""
+    if upload_compression(file) is None:
+        return file.size / estimate_row_bytes(file)
+    stream = open_csv_stream(file)
+    newlines = sum(block.count(b"\n") for block in iter(lambda: stream.read(STREAM_BLOCK_BYTES), b""))
+    file.seek(0)
+    return max(newlines - 1, 1)
+
+def estimate_chunk_rows(file, chunk_mb):
+    """Estimates how many CSV rows fit into `chunk_mb` megabytes once parsed."""
+    bytes_per_row = estimate_row_bytes(file)
+    return max(int(chunk_mb * 1024 * 1024 / (bytes_per_row * CSV_MEMORY_EXPANSION)), 1)
+
+def iter_csv_chunks(file, chunk_mb=DEFAULT_CHUNK_MB, **read_kwargs):
+    """Yields the CSV as DataFrame chunks that each stay within the chunk budget."""
+    chunk_rows = estimate_chunk_rows(file, chunk_mb)
+    with pd.read_csv(open_csv_stream(file), chunksize=chunk_rows, **read_kwargs) as reader:
+        for chunk in reader:
+            yield chunk
+
+def apply_compact_dtypes(df, schema=COMPACT_DTYPES):
+    """Casts the columns present in `df` to the pinned compact schema."""
+    dtypes = {col: dtype for col, dtype in schema.items() if col in df.columns}
+    return df.astype(dtypes)
+
+def upload_format(file):
+    """Returns the upload format from the file extension ('csv', 'parquet', 'feather' or 'arrow')."""
+    suffix = file.name.rsplit('.', 1)[-1].lower()
+    return suffix if suffix in UPLOAD_TYPES else 'csv'
+
+def project_columns(names, columns):
+    """Returns the names to read: all of them, or those listed in `columns` (missing ones are skipped)."""
+    if columns is None:
+        return list(names)
+    return [name for name in names if name in columns]
+
+def csv_header(file):
+    """Returns the column names from the CSV header row."""
+    names = pd.read_csv(open_csv_stream(file), nrows=0).columns.tolist()
+    file.seek(0)
+    return names
+
+def default_csv_backend(file):
+    """Picks the C parser for small files and a multi-core backend for large ones."""
+    if file.size < PARALLEL_CSV_THRESHOLD_BYTES:
+        return 'c'
+    if pa is not None:
+        return 'pyarrow'
+    return 'processes' if upload_compression(file) is None else 'c'
+
+def read_csv_pyarrow(file, columns=None):
+    """Parses a CSV with pyarrow's multithreaded reader."""
+    if pa is None:
+        raise ImportError("The pyarrow CSV backend requires pyarrow (pip install pyarrow).")
+    include_columns = project_columns(csv_header(file), columns)
+    table = pa.csv.read_csv(open_csv_stream(file), convert_options=pa.csv.ConvertOptions(
+        include_columns=include_columns, strings_can_be_null=True))
+    return apply_compact_dtypes(table.to_pandas(), PARSE_DTYPES)
+
+def split_csv_blocks(data, n_blocks):
+    """Splits CSV body bytes into about `n_blocks` blocks that each end on a line boundary.
+
+    Assumes no quoted field contains a newline, which holds for the Titanic manifests.
+    """
+    step = max(len(data) // n_blocks, 1)
+    bounds = [0]
+    while bounds[-1] < len(data):
+        cut = data.find(b"\n", bounds[-1] + step)
+        bounds.append(len(data) if cut == -1 else cut + 1)
+    return [data[start:end] for start, end in zip(bounds, bounds[1:])]
+
+def parse_csv_block(header, block, columns=None):
+    """Parses one block of CSV rows in a worker process, using the shared header line."""
+    usecols = None if columns is None else (lambda name: name in columns)
+    return pd.read_csv(io.BytesIO(header + block), dtype=PARSE_DTYPES, usecols=usecols)
+
+def init_worker(cache_dir):
+    """Points a pool worker at the parent's artifact store."""
+    global CACHE_DIR
+    CACHE_DIR = cache_dir
+
+def process_map(func, *iterables, workers=1):
+    """`map` over a process pool, as a list; runs inline with one worker or one task.
+
+    The Streamlit server is multi-threaded, and forking it can deadlock, so workers come
+    from a fork server (or are spawned where there is none). They import the app module
+    afresh and reopen artifacts by key instead of inheriting the parent's memory; the fork
+    server imports the libraries once, so a new pool only costs the app module itself.
+    """
+    tasks = list(zip(*iterables))
+    if workers <= 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        context.set_forkserver_preload(WORKER_PRELOAD_MODULES)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=init_worker, initargs=(CACHE_DIR,)) as pool:
+        return list(pool.map(func, *zip(*tasks)))
+
+def read_csv_processes(file, columns=None, workers=CSV_WORKERS):
+    """Parses a plain CSV with a process pool, one line-aligned block of the buffer per worker."""
+    data = file.getvalue()
+    header_end = data.find(b"\n") + 1
+    header, body = data[:header_end], data[header_end:]
+    blocks = split_csv_blocks(body, workers)
+    if len(blocks) <= 1:
+        return apply_compact_dtypes(parse_csv_block(header, body, columns), PARSE_DTYPES)
+    frames = process_map(parse_csv_block, [header] * len(blocks), blocks, [columns] * len(blocks), workers=workers)
+    return apply_compact_dtypes(pd.concat(frames, ignore_index=True), PARSE_DTYPES)
+
+def read_csv(file, columns=None, backend='c'):
+    """Reads a CSV in one pass with the given parser backend."""
+    usecols = None if columns is None else (lambda name: name in columns)
+    if backend == 'auto':
+        backend = default_csv_backend(file)
+    if backend == 'pyarrow':
+        return read_csv_pyarrow(file, columns)
+    # Splitting needs the raw text, so compressed uploads stream through the C parser instead.
+    if backend == 'processes' and upload_compression(file) is None:
+        return read_csv_processes(file, columns)
+    return pd.read_csv(open_csv_stream(file), dtype=PARSE_DTYPES, usecols=usecols)
+
+def read_arrow_table(file, fmt, columns=None):
+    """Reads a Parquet, Feather or Arrow IPC upload into an Arrow table of the selected columns."""
+    if pa is None:
+        raise ImportError(f"Reading {fmt} files requires pyarrow (pip install pyarrow).")
+    file.seek(0)
+    if fmt == 'parquet':
+        parquet_file = pa.parquet.ParquetFile(file)
+        table = parquet_file.read(columns=project_columns(parquet_file.schema_arrow.names, columns))
+    else:
+        if fmt == 'feather':
+            table = pa.feather.read_table(file)
+        else:
+            try:
+                table = pa.ipc.open_file(file).read_all()
+            except pa.ArrowInvalid:
+                file.seek(0)
+                table = pa.ipc.open_stream(file).read_all()
+        # IPC buffers are slices of the upload, so only the selected columns get converted.
+        table = table.select(project_columns(table.column_names, columns))
+    return table
+
+def read_columnar(file, fmt, columns=None):
+    """Reads a Parquet, Feather or Arrow IPC upload straight into columnar buffers."""
+    return apply_compact_dtypes(read_arrow_table(file, fmt, columns).to_pandas(), PARSE_DTYPES)
+
+def read_upload(file, columns=None, csv_backend='c'):
+    """Reads an uploaded dataset in whichever supported format it arrived in.
+
+    The free-text columns are reduced to engineered categoricals (see `engineer_features`).
+    The whole frame is held in memory; uploads that do not fit are read chunk by chunk
+    within the chunk budget by out-of-core preprocessing (see `ingest_partitioned`).
+    """
+    fmt = upload_format(file)
+    if fmt == 'csv':
+        return engineer_features(read_csv(file, columns, csv_backend))
+    return engineer_features(read_columnar(file, fmt, columns))
+
+def iter_upload_chunks(file, chunk_mb=DEFAULT_CHUNK_MB, columns=None):
+    """Yields an upload in any supported format as engineered chunks within the chunk budget."""
+    fmt = upload_format(file)
+    if fmt == 'csv':
+        usecols = None if columns is None else (lambda name: name in columns)
+        chunks = iter_csv_chunks(file, chunk_mb, dtype=PARSE_DTYPES, usecols=usecols)
+    elif fmt == 'parquet':
+        if pa is None:
+            raise ImportError("Reading parquet files requires pyarrow (pip install pyarrow).")
+        file.seek(0)
+        parquet_file = pa.parquet.ParquetFile(file)
+        metadata = parquet_file.metadata
+        row_bytes = max(metadata.row_group(0).total_byte_size / max(metadata.row_group(0).num_rows, 1), 1) \
+            if metadata.num_row_groups else 1
+        batch_rows = max(int(chunk_mb * 1024 * 1024 / (row_bytes * CSV_MEMORY_EXPANSION)), 1)
+        chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(
+            batch_rows, columns=project_columns(parquet_file.schema_arrow.names, columns)))
+    else:
+        # IPC record batches are zero-copy slices of the upload.
+        table = read_arrow_table(file, fmt, columns)
+        row_bytes = max(table.nbytes / max(table.num_rows, 1), 1)
+        batch_rows = max(int(chunk_mb * 1024 * 1024 / (row_bytes * CSV_MEMORY_EXPANSION)), 1)
+        chunks = (batch.to_pandas() for batch in table.to_batches(batch_rows))
+    for chunk in chunks:
+        yield engineer_features(apply_compact_dtypes(chunk, PARSE_DTYPES))
+
+def projection_report(file, columns, sample_rows=PROJECTION_SAMPLE_ROWS):
+    """Estimates the bytes and milliseconds saved by parsing only `columns` of a CSV upload.
+
+    Both variants are timed on the first `sample_rows` rows and scaled to the estimated
+    row count of the whole file. Returns None for non-CSV uploads.
+    """
+    if upload_format(file) != 'csv':
+        return None
+
+    def parse_sample(usecols):
+        stream = open_csv_stream(file)
+        start = time.perf_counter()
+        sample = pd.read_csv(stream, nrows=sample_rows, dtype=PARSE_DTYPES, usecols=usecols)
+        return sample, time.perf_counter() - start
+
+    full, full_seconds = parse_sample(None)
+    projected, projected_seconds = parse_sample(lambda name: name in columns)
+    file.seek(0)
+    if full.empty:
+        return None
+    scale = max(estimate_csv_rows(file) / len(full), 1)
+    full_bytes = full.memory_usage(deep=True).sum()
+    projected_bytes = projected.memory_usage(deep=True).sum()
+    return {
+        'skipped_columns': [name for name in full.columns if name not in columns],
+        'bytes_saved': int((full_bytes - projected_bytes) * scale),
+        'ms_saved': max(full_seconds - projected_seconds, 0) * 1000 * scale,
+    }
+
+def recode_categories(series, func):
+    """Applies a vectorized string function to the distinct values of a categorical only.
+
+    `func` maps a Series of categories to a Series of new values (NaN for none); each row
+    is then recoded with a single integer lookup of its category code.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    mapped = func(pd.Series(series.cat.categories, dtype=object))
+    new_categories = pd.Index(mapped.dropna().unique())
+    # The trailing -1 keeps missing rows (code -1) missing.
+    lookup = np.append(pd.Categorical(mapped, categories=new_categories).codes, -1)
+    codes = lookup[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, new_categories), index=series.index)
+
+def extract_titles(names):
+    """Title between the comma and the period of each name ('Braund, Mr. Owen' -> 'Mr')."""
+    if pa is not None:
+        # Literal splits are several times faster than a regex; the appended separator gives
+        # names without a comma an empty title instead of an out-of-range list element.
+        values = pa.array(names, type=pa.string(), from_pandas=True)
+        after_comma = pa.compute.split_pattern(pa.compute.binary_join_element_wise(values, ', ', ''),
+                                               ', ', max_splits=1)
+        before_period = pa.compute.split_pattern(pa.compute.list_element(after_comma, 1), '.', max_splits=1)
+        titles = pa.compute.list_element(before_period, 0).dictionary_encode().to_pandas()
+        titles = titles.set_axis(names.index)
+    else:
+        titles = names.str.extract(TITLE_PATTERN, expand=False).astype('category')
+    return recode_categories(titles, lambda values: values.str.strip().replace(TITLE_ALIASES).replace('', np.nan))
+
+def ticket_prefixes(tickets):
+    """Normalized non-numeric part of each ticket ('A/5 21171' -> 'A5', '113803' -> NaN)."""
+    if pa is not None:
+        prefixes = pa.compute.utf8_trim_whitespace(
+            pa.compute.utf8_rtrim(pa.array(tickets, type=pa.string(), from_pandas=True), '0123456789'))
+        for separator in ('.', '/', ' '):
+            prefixes = pa.compute.replace_substring(prefixes, separator, '')
+        prefixes = pd.Series(pa.compute.utf8_upper(prefixes).to_pandas(), dtype=object)
+    else:
+        prefixes = tickets.str.rstrip('0123456789').str.replace(r'[./\s]', '', regex=True).str.upper()
+    return prefixes.replace('', np.nan)
+
+def engineer_features(df):
+    """Reduces the free-text columns to compact categoricals right after parsing.
+
+    Name becomes Title, Cabin becomes Deck (its first letter) and Ticket gains a normalized
+    TicketPrefix ('A/5 21171' -> 'A5'); Ticket itself is kept as a categorical for group
+    sizes. Only Name is scanned row by row, with Arrow string kernels when pyarrow is
+    available; the others are computed on their distinct values.
+    """
+    columns = {column: series for column, series in df.items() if column not in ('Name', 'Cabin')}
+    if 'Name' in df.columns:
+        columns['Title'] = extract_titles(df['Name'])
+    if 'Cabin' in df.columns:
+        columns['Deck'] = recode_categories(df['Cabin'], lambda cabins: cabins.str[0])
+    if 'Ticket' in df.columns:
+        columns['TicketPrefix'] = recode_categories(df['Ticket'], ticket_prefixes)
+    return pd.DataFrame(columns, copy=False)
+
+def validation_rules(df, require_target):
+    """Returns a boolean mask per rule marking the rows that violate it.
+
+    Missing Age and Fare values are allowed because preprocessing imputes them.
+    """
+    rules = {}
+    for column in ['PassengerId', 'Pclass', 'Age', 'SibSp', 'Parch', 'Fare'] + (['Survived'] if require_target else []):
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            numeric = pd.to_numeric(df[column], errors='coerce')
+            rules[f'{column} not numeric'] = numeric.isna() & df[column].notna()
+            df[column] = numeric
+    rules['PassengerId missing'] = df['PassengerId'].isna()
+    rules['Pclass not in {1, 2, 3}'] = ~df['Pclass'].isin([1, 2, 3])
+    rules['Sex not in {female, male}'] = ~df['Sex'].isin(['female', 'male'])
+    rules['Age outside [0, 120]'] = df['Age'].notna() & ~df['Age'].between(0, 120)
+    rules['SibSp missing or negative'] = ~(df['SibSp'] >= 0)
+    rules['Parch missing or negative'] = ~(df['Parch'] >= 0)
+    rules['Fare negative'] = df['Fare'] < 0
+    if require_target:
+        rules['Survived not in {0, 1}'] = ~df['Survived'].isin([0, 1])
+    return rules
+
+def check_required_columns(columns, require_target, name):
+    """Raises ValueError if a required column is missing from an upload."""
+    required = [column for column in CORE_COLUMNS if require_target or column != 'Survived']
+    missing = [column for column in required if column not in columns]
+    if missing:
+        raise ValueError(f"{name} is missing required columns: {missing}")
+
+def validate_frame(df, require_target, name):
+    """Splits a loaded frame into clean rows and a quarantine frame of rows that break a rule.
+
+    Every rule is a vectorized expression over a single column, so the whole pass costs one
+    scan of the data. The quarantine frame holds the offending rows plus one boolean column
+    per rule (prefixed with RULE_PREFIX), from which per-rule counts are summed.
+    """
+    check_required_columns(df.columns, require_target, name)
+    df = df.copy(deep=False)
+    violations = pd.DataFrame(validation_rules(df, require_target)).add_prefix(RULE_PREFIX)
+    bad = violations.any(axis=1).to_numpy()
+    if not bad.any():
+        return apply_compact_dtypes(df), violations.iloc[:0]
+    clean = df[~bad].reset_index(drop=True)
+    # Integer columns are float while rows with gaps are present; clean rows cast back losslessly.
+    clean = clean.astype({column: 'int64' for column in ['PassengerId', 'Survived'] if column in clean.columns})
+    clean = apply_compact_dtypes(clean)
+    quarantine = pd.concat([df[bad].reset_index(drop=True), violations[bad].reset_index(drop=True)], axis=1)
+    return clean, quarantine
+
+def rule_counts(quarantine):
+    """Number of quarantined rows per validation rule."""
+    counts = quarantine.filter(like=RULE_PREFIX).sum()
+    counts.index = counts.index.str.removeprefix(RULE_PREFIX)
+    return counts
+
+def check_clean_rows(n_rows, quarantine, name):
+    """Raises ValueError if no row of an upload passed validation, with the quarantine's per-rule counts."""
+    if n_rows:
+        return
+    counts = rule_counts(quarantine)
+    summary = ', '.join(f"{rule}: {count}" for rule, count in counts[counts > 0].items())
+    raise ValueError(f"{name} has no rows that pass validation"
+                     + (f" ({len(quarantine)} quarantined; {summary})" if len(quarantine) else ""))
+
+def optimize_dtypes(df):
+    """Downcasts numeric columns to the smallest safe type and low-cardinality strings to categoricals.
+
+    Returns the optimized frame and a per-column report of dtypes and bytes before and after.
+    """
+    optimized = {}
+    for column, series in df.items():
+        if pd.api.types.is_integer_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast='float')
+        elif series.dtype == object and series.nunique() <= CATEGORY_MAX_UNIQUE_RATIO * len(series):
+            series = series.astype('category')
+        optimized[column] = series
+    optimized_df = pd.DataFrame(optimized, copy=False)
+    report = pd.DataFrame({
+        'dtype before': df.dtypes.astype(str),
+        'dtype after': optimized_df.dtypes.astype(str),
+        'bytes before': df.memory_usage(index=False, deep=True),
+        'bytes after': optimized_df.memory_usage(index=False, deep=True),
+    })
+    return optimized_df, report
+
+def load_data(train_file, test_file, columns=None, csv_backend='auto', engine='pandas'):
+    """Loads, validates and caches the training and testing data.
+
+    Returns the clean train and test frames followed by their quarantine frames, or Nones
+    (after showing the error) if an upload cannot be read or has no valid rows.
+    """
     try:
-        train_df = pd.read_csv(train_file)
-        test_df = pd.read_csv(test_file)
-        return train_df, test_df
+        if engine == 'polars':
+            train_df, train_quarantine = load_frame_polars(train_file, True, columns)
+            test_df, test_quarantine = load_frame_polars(test_file, False, columns)
+        else:
+            train_df = read_upload(train_file, columns, csv_backend)
+            test_df = read_upload(test_file, columns, csv_backend)
+            train_df, train_quarantine = validate_frame(train_df, True, train_file.name)
+            test_df, test_quarantine = validate_frame(test_df, False, test_file.name)
+        check_clean_rows(len(train_df), train_quarantine, train_file.name)
+        check_clean_rows(len(test_df), test_quarantine, test_file.name)
+        return train_df, test_df, train_quarantine, test_quarantine
     except Exception as e:
         st.error(f"Error loading data: {e}")
-        return None, None
+        return None, None, None, None
 
-@st.cache_data
-def preprocess_data(train_df, test_df):
-    """Applies all preprocessing steps to the data."""
-    train_processed = train_df.copy()
-    test_processed = test_df.copy()
-    
-    age_mean = train_processed['Age'].mean()
-    train_processed['Age'].fillna(age_mean, inplace=True)
-    test_processed['Age'].fillna(age_mean, inplace=True)
-    
-    fare_median = train_processed['Fare'].median()
-    train_processed['Fare'].fillna(fare_median, inplace=True)
-    test_processed['Fare'].fillna(fare_median, inplace=True)
-    
-    train_processed['Sex'] = train_processed['Sex'].replace(['female', 'male'], [0, 1])
-    test_processed['Sex'] = test_processed['Sex'].replace(['female', 'male'], [0, 1])
-    
-    cols_to_drop = ['Name', 'Ticket', 'Cabin', 'Embarked']
-    train_processed.drop(columns=cols_to_drop, inplace=True)
-    test_processed.drop(columns=cols_to_drop, inplace=True)
-    
-    return train_processed, test_processed
+# --- Polars Engine ---
+def default_engine(*files):
+    """Picks pandas for small uploads and Polars' multithreaded lazy engine for large ones."""
+    if pl is None or sum(file.size for file in files) < POLARS_THRESHOLD_BYTES:
+        return 'pandas'
+    return 'polars'
 
-@st.cache_data
-def train_model(train_processed):
-    """Trains the Logistic Regression model and splits the data."""
-    X = train_processed.drop(columns=['Survived', 'PassengerId'])
-    y = train_processed['Survived']
+def scan_upload_polars(file, columns=None):
+    """Lazily scans an upload with Polars, keeping only the selected columns.
+
+    CSV fields are all read as strings and cast during validation, so that non-numeric
+    values are quarantined as in the pandas engine instead of failing the scan. Compressed
+    CSVs are not scanned here (see `load_frame_polars`).
+    """
+    if pl is None:
+        raise ImportError("The Polars engine requires polars (pip install polars).")
+    fmt = upload_format(file)
+    if fmt == 'csv':
+        frame = pl.scan_csv(file.getvalue(), infer_schema=False, null_values=POLARS_NULL_VALUES)
+    else:
+        frame = pl.from_arrow(read_arrow_table(file, fmt, columns)).lazy()
+    return frame.select(project_columns(frame.collect_schema().names(), columns))
+
+def polars_engineered_columns(names):
+    """Polars expressions for the columns added by `engineer_features`."""
+    def non_empty(expr):
+        return pl.when(expr != '').then(expr)
+
+    exprs = []
+    if 'Name' in names:
+        after_comma = pl.col('Name').str.splitn(', ', 2).struct.field('field_1')
+        title = after_comma.str.splitn('.', 2).struct.field('field_0').str.strip_chars()
+        exprs.append(non_empty(title.replace(TITLE_ALIASES)).alias('Title'))
+    if 'Cabin' in names:
+        exprs.append(non_empty(pl.col('Cabin').str.slice(0, 1)).alias('Deck'))
+    if 'Ticket' in names:
+        prefix = pl.col('Ticket').str.strip_chars_end('0123456789').str.strip_chars()
+        exprs.append(non_empty(prefix.str.replace_all(r'[./\s]', '').str.to_uppercase()).alias('TicketPrefix'))
+    return exprs
+
+def polars_validation_rules(require_target):
+    """Polars expressions for `validation_rules`, evaluated on the raw (string) columns."""
+    numeric_columns = ['PassengerId', 'Pclass', 'Age', 'SibSp', 'Parch', 'Fare'] + (['Survived'] if require_target else [])
+    value = {column: pl.col(column).cast(pl.Float64, strict=False) for column in numeric_columns}
+    rules = {f'{column} not numeric': pl.col(column).is_not_null() & value[column].is_null()
+             for column in numeric_columns}
+    rules['PassengerId missing'] = value['PassengerId'].is_null()
+    rules['Pclass not in {1, 2, 3}'] = ~value['Pclass'].is_in([1.0, 2.0, 3.0]).fill_null(False)
+    rules['Sex not in {female, male}'] = ~pl.col('Sex').cast(pl.String).is_in(['female', 'male']).fill_null(False)
+    rules['Age outside [0, 120]'] = value['Age'].is_not_null() & ~value['Age'].is_between(0, 120)
+    rules['SibSp missing or negative'] = ~(value['SibSp'] >= 0).fill_null(False)
+    rules['Parch missing or negative'] = ~(value['Parch'] >= 0).fill_null(False)
+    rules['Fare negative'] = (value['Fare'] < 0).fill_null(False)
+    if require_target:
+        rules['Survived not in {0, 1}'] = ~value['Survived'].is_in([0.0, 1.0]).fill_null(False)
+    return {RULE_PREFIX + name: rule for name, rule in rules.items()}
+
+def load_frame_polars(file, require_target, columns=None):
+    """Polars counterpart of `read_upload` + `validate_frame`, run as one lazy query.
+
+    The projection is pushed into the scan, the rules, casts and engineered features are
+    evaluated by multithreaded kernels, and the clean and quarantined rows are collected
+    together so the scan is shared. 'not numeric' rules that no row breaks are dropped, as
+    the pandas engine only checks columns that did not parse as numbers.
+
+    Polars can only scan a compressed CSV after decompressing all of it into memory, so
+    those are read by the pandas engine, which decompresses as it parses; the result is the same.
+    """
+    if upload_compression(file) is not None:
+        return validate_frame(read_upload(file, columns), require_target, file.name)
+    frame = scan_upload_polars(file, columns)
+    names = frame.collect_schema().names()
+    check_required_columns(names, require_target, file.name)
+
+    rules = polars_validation_rules(require_target)
+    casts = [pl.col(column).cast(pl.Float64, strict=False) for column in ['PassengerId', 'Survived', 'Age', 'Fare',
+                                                                       'Pclass', 'SibSp', 'Parch'] if column in names]
+    categories = [pl.col(column).cast(pl.String).cast(pl.Categorical)
+                  for column in ['Sex', 'Embarked', 'Ticket'] if column in names]
+    frame = (frame.with_columns(**rules)
+             .with_columns(*casts, *categories, *[expr.cast(pl.Categorical) for expr in polars_engineered_columns(names)])
+             .drop('Name', 'Cabin', strict=False))
+    data_columns = [column for column in frame.collect_schema().names() if column not in rules]
+    bad = pl.any_horizontal(*rules)
+    # Integer columns are float while rows with gaps are present; clean rows cast back losslessly.
+    integer_casts = {'PassengerId': pl.Int64, 'Survived': pl.Int64}
+    clean, quarantine = pl.collect_all(
+        [frame.filter(~bad).select(data_columns).with_columns(
+            pl.col(column).cast(dtype) for column, dtype in integer_casts.items() if column in data_columns),
+         frame.filter(bad).select(data_columns + list(rules))])
+    unused_rules = [name for name in rules if name.endswith(' not numeric') and not quarantine[name].any()]
+    quarantine = quarantine.drop(unused_rules)
+    return (apply_compact_dtypes(clean.to_pandas()),
+            apply_compact_dtypes(quarantine.to_pandas(), PARSE_DTYPES))
+
+def polars_frame(df):
+    """Lazy Polars view of a pandas frame, leaving out Ticket (handled on its pandas codes)."""
+    return pl.DataFrame({column: series for column, series in df.items() if column != 'Ticket'}).lazy()
+
+def polars_value_counts(frame, column):
+    """Lazy per-value row counts of a column, missing values skipped."""
+    return frame.group_by(column).agg(pl.len()).drop_nulls(column)
+
+def counts_to_pandas(counts):
+    """Converts collected `polars_value_counts` output to a pandas Series indexed by value."""
+    column = counts.columns[0]
+    return pd.Series(counts['len'].to_numpy(), index=pd.Index(counts[column].cast(pl.String).to_list(), dtype=object))
+
+def polars_one_hot(column, encoder, present=True):
+    """Polars expressions for `CategoricalEncoder.one_hot_columns` (all zeros if the column is absent)."""
+    exprs = []
+    for category in encoder.vocabulary_:
+        indicator = (pl.col(column).cast(pl.String) == category).fill_null(False) if present else pl.lit(False)
+        exprs.append(indicator.cast(pl.Int8).alias(f"{column}_{category}"))
+    return exprs
+
+class RunningMean:
+    """Mergeable running mean; missing values are skipped."""
+
+    def __init__(self, total=0.0, count=0):
+        self.total = total
+        self.count = count
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        self.total += float(values.sum())
+        self.count += len(values)
+        return self
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else float('nan')
+
+class QuantileSketch:
+    """Mergeable KLL-style quantile sketch with bounded memory; missing values are skipped.
+
+    Level h holds items of weight 2**h. A level that outgrows `k` items is sorted and every
+    other item (random offset) is promoted to the next level. Each such compaction moves the
+    rank of any query by at most 2**h, and `rank_error_bound` tracks the sum of those moves,
+    a deterministic bound on the absolute rank error of every quantile.
+    """
+
+    def __init__(self, k=QUANTILE_SKETCH_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rank_error_bound = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype='float64')
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for h, level in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.count += other.count
+        self.rank_error_bound += other.rank_error_bound
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # An odd item out stays behind so that promoted pairs are exact halves.
+                leftover = len(level) % 2
+                promoted = level[leftover + self._rng.integers(2)::2]
+                self.rank_error_bound += 2 ** h
+                self.levels[h] = level[:leftover]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+            h += 1
+
+    def quantile(self, q):
+        """Approximate q-quantile of everything seen so far."""
+        if not self.count:
+            return float('nan')
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        return float(values[order][np.searchsorted(cumulative, q * cumulative[-1])])
+
+    @property
+    def relative_error_bound(self):
+        """Guaranteed rank error as a fraction of the items seen."""
+        return self.rank_error_bound / self.count if self.count else 0.0
+
+def chunk_statistics(chunk):
+    """Imputation statistics of one chunk; results from chunks or workers combine with `merge`."""
+    return RunningMean().update(chunk['Age']), QuantileSketch().update(chunk['Fare'])
+
+def streaming_statistics(chunks):
+    """Merges per-chunk statistics into the Age running mean and the Fare quantile sketch."""
+    age, fare = RunningMean(), QuantileSketch()
+    for chunk_age, chunk_fare in map(chunk_statistics, chunks):
+        age.merge(chunk_age)
+        fare.merge(chunk_fare)
+    return age, fare
+
+def statistics_report(train_df, chunk_rows=STATS_CHUNK_ROWS):
+    """Compares the streaming statistics over `chunk_rows` chunks with the exact in-memory ones."""
+    chunks = (train_df.iloc[start:start + chunk_rows] for start in range(0, len(train_df), chunk_rows))
+    age, fare = streaming_statistics(chunks)
+    fares = np.sort(train_df['Fare'].dropna().to_numpy(dtype='float64'))
+    exact_median = float(np.median(fares))
+    sketch_median = fare.quantile(0.5)
+    # Rank interval occupied by the sketch's answer, as fractions of the column.
+    rank_low = np.searchsorted(fares, sketch_median, side='left') / max(len(fares), 1)
+    rank_high = np.searchsorted(fares, sketch_median, side='right') / max(len(fares), 1)
+    return {
+        'age_mean': (age.mean, float(train_df['Age'].mean())),
+        'fare_median': (sketch_median, exact_median),
+        'observed_rank_error': max(rank_low - 0.5, 0.5 - rank_high, 0.0),
+        'rank_error_bound': fare.relative_error_bound,
+    }
+
+def feature_correlation(features, chunk_rows=STATS_CHUNK_ROWS):
+    """Pearson correlation of the feature columns, the same as `DataFrame.corr()` on the matrix.
+
+    Sums and cross-products are accumulated in float64 one chunk at a time, so only a chunk
+    of the (memory-mapped) float32 matrix is ever converted. Values are shifted by the first
+    chunk's means to avoid cancellation; constant columns get NaN, as in pandas.
+    """
+    X = features.X
+    shift = np.asarray(X[:chunk_rows], dtype='float64').mean(axis=0)
+    total = np.zeros(X.shape[1])
+    cross = np.zeros((X.shape[1], X.shape[1]))
+    for start in range(0, len(X), chunk_rows):
+        chunk = np.asarray(X[start:start + chunk_rows], dtype='float64') - shift
+        total += chunk.sum(axis=0)
+        cross += chunk.T @ chunk
+    mean = total / len(X)
+    covariance = cross / len(X) - np.outer(mean, mean)
+    std = np.sqrt(np.clip(np.diag(covariance), 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = np.clip(covariance / np.outer(std, std), -1, 1)
+    return pd.DataFrame(corr, index=features.columns, columns=features.columns)
+
+def age_group_medians(df, columns):
+    """Median Age per group of `columns`, as a Series indexed by group; groups without a known age are left out."""
+    return df.groupby(columns, observed=True)['Age'].median().dropna().astype('float64')
+
+def update_age_group_sketches(sketches, chunk, columns):
+    """Adds a chunk's ages to one `QuantileSketch` per group (a loop over groups, not rows)."""
+    for group, ages in chunk.groupby(columns, observed=True)['Age']:
+        sketches.setdefault(group, QuantileSketch()).update(ages)
+    return sketches
+
+def sketched_age_group_medians(sketches, columns):
+    """`age_group_medians` from per-group sketches, approximate like the streamed Fare median."""
+    index = pd.MultiIndex.from_tuples(list(sketches), names=columns)
+    return pd.Series([sketch.quantile(0.5) for sketch in sketches.values()], index=index, dtype='float64').dropna()
+
+def lookup_groups(table, df):
+    """Looks up every row's group (the columns named by `table`'s index) in `table`; NaN where absent."""
+    keys = [df[column] for column in table.index.names]
+    index = pd.MultiIndex.from_arrays(keys) if isinstance(table.index, pd.MultiIndex) else pd.Index(keys[0])
+    return table.reindex(index).to_numpy()
+
+class RowSample:
+    """Mergeable uniform sample of at most `k` rows: the rows with the `k` smallest random priorities."""
+
+    def __init__(self, k, seed=0):
+        self.k = k
+        self.rows = None
+        self.priorities = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, rows):
+        priorities = np.concatenate([self.priorities, self._rng.random(len(rows))])
+        rows = rows if self.rows is None else np.concatenate([self.rows, rows])
+        if len(priorities) > self.k:
+            keep = np.sort(np.argpartition(priorities, self.k)[:self.k])
+            rows, priorities = rows[keep], priorities[keep]
+        self.rows, self.priorities = rows, priorities
+        return self
+
+def knn_matrix(df, fallbacks):
+    """The KNN_FEATURES of `df` as a float64 matrix, with missing values filled from `fallbacks`."""
+    columns = []
+    for column in KNN_FEATURES:
+        if column == 'Sex':
+            values = (df['Sex'] == 'male').to_numpy(dtype='float64')
+        else:
+            values = df[column].to_numpy(dtype='float64')
+            if column in fallbacks:
+                values = np.where(np.isnan(values), fallbacks[column], values)
+        columns.append(values)
+    return np.column_stack(columns)
+
+def complete_knn_rows(df):
+    """`knn_matrix` of the rows with both Age and Fare known."""
+    complete = df['Age'].notna().to_numpy() & df['Fare'].notna().to_numpy()
+    return knn_matrix(df.loc[complete, KNN_FEATURES], {})
+
+class KNNImputer:
+    """Imputes one KNN_FEATURES column with the mean of its `k` nearest complete rows.
+
+    Distances are Euclidean over the other features, standardized with the indexed rows'
+    mean and deviation. The rows live in a KD-tree, so a query visits about log(rows) nodes
+    instead of every training row, and queries run `batch_rows` at a time to bound the
+    neighbour arrays. Build and query times are kept for the preprocessing report.
+    """
+
+    def __init__(self, column, k=KNN_NEIGHBORS, batch_rows=KNN_QUERY_BATCH_ROWS):
+        self.column = column
+        self.k = k
+        self.batch_rows = batch_rows
+
+    def fit(self, rows):
+        """Indexes complete rows (a `knn_matrix` without gaps)."""
+        target = KNN_FEATURES.index(self.column)
+        self.features_ = [i for i in range(len(KNN_FEATURES)) if i != target]
+        features = rows[:, self.features_]
+        self.center_ = features.mean(axis=0)
+        scale = features.std(axis=0)
+        self.scale_ = np.where(scale > 0, scale, 1.0)
+        self.values_ = rows[:, target]
+        start = time.perf_counter()
+        self.tree_ = KDTree((features - self.center_) / self.scale_)
+        self.build_seconds_ = time.perf_counter() - start
+        self.query_rows_ = 0
+        self.query_seconds_ = 0.0
+        return self
+
+    def predict(self, rows):
+        """The neighbour mean of the column for every row of a `knn_matrix`."""
+        start = time.perf_counter()
+        features = (rows[:, self.features_] - self.center_) / self.scale_
+        k = min(self.k, len(self.values_))
+        fills = np.empty(len(rows))
+        for begin in range(0, len(rows), self.batch_rows):
+            _, neighbours = self.tree_.query(features[begin:begin + self.batch_rows], k=k)
+            fills[begin:begin + self.batch_rows] = self.values_[neighbours].mean(axis=1)
+        self.query_rows_ += len(rows)
+        self.query_seconds_ += time.perf_counter() - start
+        return fills
+
+def value_counts(series):
+    """Rows per distinct value, indexed by value; missing values and unused categories are skipped."""
+    counts = series.value_counts(sort=False)
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(object)
+    return counts
+
+def merge_counts(counts):
+    """Sums `value_counts` from several chunks, ignoring chunks without the column (None)."""
+    counts = [c for c in counts if c is not None]
+    if not counts:
+        return None
+    return pd.concat(counts).groupby(level=0, sort=False).sum()
+
+class CategoricalEncoder:
+    """Encodes strings as integer codes from a fixed vocabulary learned at fit time.
+
+    Codes come from a hash lookup of each category against the vocabulary (for categorical
+    input only the categories are looked up, not every row). Values outside the vocabulary,
+    including missing ones, follow `unknown`: 'error' raises, 'ignore' gives code -1 and an
+    all-zero one-hot row. A learned vocabulary keeps only values seen at least `min_count`
+    times, so rare values are treated as unknown.
+    """
+
+    def __init__(self, vocabulary=None, unknown='ignore', min_count=1):
+        self.vocabulary = vocabulary
+        self.unknown = unknown
+        self.min_count = min_count
+
+    def fit(self, series):
+        return self.fit_counts(series.value_counts() if self.vocabulary is None else None)
+
+    def fit_counts(self, counts):
+        """Learns the vocabulary from per-value counts (a Series indexed by value)."""
+        if self.vocabulary is not None:
+            self.vocabulary_ = list(self.vocabulary)
+        else:
+            self.vocabulary_ = sorted(counts.index[counts >= self.min_count].tolist())
+        return self
+
+    def codes(self, series):
+        """Integer code of every value, or -1 for values outside the vocabulary."""
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.set_categories(self.vocabulary_).cat.codes.to_numpy()
+        else:
+            codes = pd.Categorical(series, categories=self.vocabulary_).codes
+        if self.unknown == 'error' and (codes == -1).any():
+            unseen = series[codes == -1].unique().tolist()
+            raise ValueError(f"{series.name} has values outside the learned vocabulary: {unseen}")
+        return codes
+
+    def one_hot_columns(self, series):
+        """One indicator per vocabulary entry, as named int8 columns."""
+        codes = self.codes(series)
+        columns = {}
+        for i, category in enumerate(self.vocabulary_):
+            # A bool comparison viewed as int8 costs one byte per row and no extra copy.
+            columns[f"{series.name}_{category}"] = (codes == i).view('int8')
+        return columns
+
+class TitanicPreprocessor:
+    """Fitted, picklable preprocessing step.
+
+    `fit` learns the imputation statistics once from the training data (or `fit_chunks`
+    from chunks that never need to be in memory together); `transform` then preprocesses
+    any batch (one row, a chunk or a whole file) in time proportional to the batch, so
+    prediction, evaluation and batch scoring all share the same fitted state.
+
+    Besides imputing and encoding, it adds FamilySize (SibSp + Parch + 1), TicketGroupSize
+    (passengers sharing the ticket in the training data, 1 for unseen tickets) and one-hot
+    columns for the engineered categoricals that the training data has.
+
+    Missing ages are imputed with the training median of the row's `age_groups` group (the
+    columns the training data has), learned as a small lookup table; rows of unseen groups,
+    or every row with `age_groups=None`, get the global training mean. With `imputer='knn'`,
+    missing Age and Fare values are the mean over the nearest complete training rows instead
+    (see `KNNImputer`).
+
+    With `engine='polars'`, `fit` and `transform` run as Polars lazy queries instead; the
+    fitted state and the output are the same.
+    """
+
+    drop_columns = ['Name', 'Ticket', 'Cabin'] + ENGINEERED_CATEGORIES
+    # Columns whose value counts are learned: vocabularies, plus Ticket for the group sizes.
+    counted_columns = ['Embarked'] + ENGINEERED_CATEGORIES + ['Ticket']
+
+    def __init__(self, engine='pandas', age_groups=AGE_GROUP_COLUMNS, imputer='group'):
+        self.engine = engine
+        self.age_groups = age_groups
+        self.imputer = imputer
+
+    def _age_group_columns(self, columns):
+        return [column for column in self.age_groups or [] if column in columns]
+
+    def _count_values(self, df):
+        return {column: value_counts(df[column]) for column in self.counted_columns if column in df.columns}
+
+    def _fit_counts(self, counts):
+        """Learns the vocabularies and ticket counts from per-column value counts."""
+        # Kept so appended rows can be folded into the vocabularies (see `update`).
+        self.category_counts_ = {column: column_counts for column, column_counts in counts.items() if column != 'Ticket'}
+        self.ticket_counts_ = counts.get('Ticket')
+        # Sex is validated at ingestion, so anything unseen here is a bug, not data.
+        self.sex_encoder_ = CategoricalEncoder(['female', 'male'], unknown='error').fit_counts(None)
+        self.embarked_encoder_ = CategoricalEncoder(unknown='ignore').fit_counts(counts['Embarked'])
+        self.feature_encoders_ = {
+            column: CategoricalEncoder(unknown='ignore', min_count=MIN_CATEGORY_COUNT).fit_counts(counts[column])
+            for column in ENGINEERED_CATEGORIES if column in counts}
+
+    def _fit_knn(self, sample):
+        """Indexes the sampled complete rows for the KNN imputer (`sample` is None for the others)."""
+        self.knn_sample_ = sample
+        if sample is None or sample.rows is None or not len(sample.rows):
+            self.knn_imputers_ = {}
+        else:
+            self.knn_imputers_ = {column: KNNImputer(column).fit(sample.rows) for column in ('Age', 'Fare')}
+
+    def fit(self, train_df):
+        """Learns the imputation statistics and category vocabularies from the training data."""
+        if self.engine == 'polars':
+            return self._fit_polars(train_df)
+        self.age_stats_ = RunningMean().update(train_df['Age'])
+        self.age_mean_ = self.age_stats_.mean
+        self.fare_median_ = float(train_df['Fare'].median())
+        groups = self._age_group_columns(train_df.columns)
+        self.age_group_medians_ = age_group_medians(train_df, groups) if groups else None
+        self._fit_counts(self._count_values(train_df))
+        self._fit_knn(RowSample(KNN_INDEX_ROWS).update(complete_knn_rows(train_df)) if self.imputer == 'knn' else None)
+        return self
+
+    def _fit_polars(self, train_df):
+        """`fit` as one Polars query: the statistics and value counts share a single scan.
+
+        Ticket is counted on its categorical codes instead; converting its (mostly distinct)
+        values to Polars would cost more than the count.
+        """
+        frame = polars_frame(train_df)
+        counted = [column for column in self.counted_columns[:-1] if column in train_df.columns]
+        groups = self._age_group_columns(train_df.columns)
+        group_keys = [pl.col(column).cast(pl.String) if column != 'Pclass' else pl.col(column) for column in groups]
+        statistics, *counts, group_medians = pl.collect_all(
+            [frame.select(age_total=pl.col('Age').cast(pl.Float64).sum(), age_count=pl.col('Age').count(),
+                          fare_median=pl.col('Fare').cast(pl.Float64).median())]
+            + [polars_value_counts(frame, column) for column in counted]
+            + [frame.group_by(group_keys).agg(pl.col('Age').cast(pl.Float64).median()).drop_nulls()
+               if groups else pl.LazyFrame()])
+        counts = {column: counts_to_pandas(column_counts) for column, column_counts in zip(counted, counts)}
+        self.age_stats_ = RunningMean(statistics['age_total'][0], statistics['age_count'][0])
+        self.age_mean_ = self.age_stats_.mean
+        self.fare_median_ = statistics['fare_median'][0]
+        self.age_group_medians_ = group_medians.to_pandas().set_index(groups)['Age'] if groups else None
+        # The KD-tree is built from numpy arrays with either engine.
+        self._fit_knn(RowSample(KNN_INDEX_ROWS).update(complete_knn_rows(train_df)) if self.imputer == 'knn' else None)
+        if 'Ticket' in train_df.columns:
+            counts['Ticket'] = value_counts(train_df['Ticket'])
+        self._fit_counts(counts)
+        return self
+
+    def fit_chunks(self, chunks):
+        """Learns the statistics from chunks with a running mean and a Fare quantile sketch.
+
+        Value counts are summed over the chunks, so the vocabularies and ticket counts are
+        the same as from `fit`. The Age group medians come from one sketch per group, and
+        the KNN index from a uniform sample drawn across the chunks.
+        """
+        counts = []
+        age_sketches = {}
+        groups = []
+        knn_sample = RowSample(KNN_INDEX_ROWS) if self.imputer == 'knn' else None
+
+        def counted(chunks):
+            for chunk in chunks:
+                counts.append(self._count_values(chunk))
+                groups[:] = self._age_group_columns(chunk.columns)
+                if groups:
+                    update_age_group_sketches(age_sketches, chunk, groups)
+                if knn_sample is not None:
+                    knn_sample.update(complete_knn_rows(chunk))
+                yield chunk
+
+        self.age_stats_, fare_sketch = streaming_statistics(counted(chunks))
+        self._fit_counts({column: merge_counts([chunk_counts.get(column) for chunk_counts in counts])
+                          for column in counts[0]})
+        self.age_mean_ = self.age_stats_.mean
+        self.fare_median_ = fare_sketch.quantile(0.5)
+        self.age_group_medians_ = sketched_age_group_medians(age_sketches, groups) if groups else None
+        self._fit_knn(knn_sample)
+        return self
+
+    def vocabularies(self):
+        """The one-hot vocabulary of every encoded column; equal vocabularies give equal output columns."""
+        encoders = {'Embarked': self.embarked_encoder_, **self.feature_encoders_}
+        return {column: encoder.vocabulary_ for column, encoder in encoders.items()}
+
+    def update(self, delta_df, train_df):
+        """Folds appended rows into the statistics without rescanning the old rows' Age.
+
+        An exact median is not decomposable, so the Fare and Age group medians are
+        re-selected over the combined (already parsed) columns. The delta's value counts are
+        merged into the vocabularies, which can then gain columns (see `vocabularies`).
+        """
+        self.age_mean_ = self.age_stats_.update(delta_df['Age']).mean
+        self.fare_median_ = float(train_df['Fare'].median())
+        if self.age_group_medians_ is not None:
+            self.age_group_medians_ = age_group_medians(train_df, self.age_group_medians_.index.names)
+        if self.knn_sample_ is not None:
+            self._fit_knn(self.knn_sample_.update(complete_knn_rows(delta_df)))
+        delta_counts = self._count_values(delta_df)
+        self._fit_counts({column: merge_counts([column_counts, delta_counts.get(column)])
+                          for column, column_counts in {**self.category_counts_, 'Ticket': self.ticket_counts_}.items()})
+        return self
+
+    def transform(self, df):
+        """Applies all preprocessing steps to a batch of passengers.
+
+        The output is assembled column by column: only Age, Fare (when they have gaps), the
+        Sex codes and the Embarked one-hot columns are newly allocated, every other column
+        shares the input's buffer, and the input (possibly a read-only memory map) is never
+        modified. Unknown ports get all-zero Embarked indicators. The engineered columns always
+        come last in a fixed order, even for batches missing the optional text columns.
+        """
+        if self.engine == 'polars':
+            return self._transform_polars(df)
+        columns = {}
+        for column, series in df.items():
+            # Text columns are normally reduced at ingestion; the engineered ones are encoded below.
+            if column in self.drop_columns:
+                continue
+            if column in ('Age', 'Fare') and series.hasnans:
+                series = self.impute(df, column)
+            elif column == 'Sex':
+                series = self.sex_encoder_.codes(series)
+            elif column == 'Embarked':
+                columns.update(self.embarked_encoder_.one_hot_columns(series))
+                continue
+            columns[column] = series
+        columns['FamilySize'] = df['SibSp'].to_numpy().astype('int16') + df['Parch'].to_numpy() + 1
+        if self.ticket_counts_ is not None:
+            columns['TicketGroupSize'] = self.ticket_group_sizes(df)
+        for column, encoder in self.feature_encoders_.items():
+            if column in df.columns:
+                series = df[column]
+            else:
+                series = pd.Series(pd.Categorical.from_codes(np.full(len(df), -1), []), index=df.index, name=column)
+            columns.update(encoder.one_hot_columns(series))
+        return pd.DataFrame(columns, copy=False)
+
+    def _transform_polars(self, df):
+        """`transform` as one Polars query with the same output columns and dtypes."""
+        exprs = []
+        for column in df.columns:
+            if column in self.drop_columns:
+                continue
+            expr = pl.col(column)
+            if column == 'Age' and not self.knn_imputers_ and self.age_group_medians_ is None:
+                expr = expr.fill_null(pl.lit(self.age_mean_, dtype=pl.Float32))
+            elif column == 'Fare' and not self.knn_imputers_:
+                expr = expr.fill_null(pl.lit(self.fare_median_, dtype=pl.Float32))
+            elif column in ('Age', 'Fare'):
+                # Looked up on the pandas columns, like the ticket group sizes.
+                expr = pl.lit(pl.Series(column, self.impute(df, column).to_numpy()))
+            elif column == 'Sex':
+                vocabulary = self.sex_encoder_.vocabulary_
+                expr = expr.cast(pl.String).replace_strict(vocabulary, range(len(vocabulary)), return_dtype=pl.Int8)
+            elif column == 'Embarked':
+                exprs.extend(polars_one_hot(column, self.embarked_encoder_))
+                continue
+            exprs.append(expr)
+        exprs.append((pl.col('SibSp').cast(pl.Int16) + pl.col('Parch') + 1).alias('FamilySize'))
+        if self.ticket_counts_ is not None:
+            # Looked up on the pandas codes, one hash probe per distinct ticket.
+            exprs.append(pl.lit(pl.Series('TicketGroupSize', self.ticket_group_sizes(df))))
+        for column, encoder in self.feature_encoders_.items():
+            exprs.extend(polars_one_hot(column, encoder, column in df.columns))
+        return polars_frame(df).select(exprs).collect().to_pandas()
+
+    def impute(self, df, column):
+        """The Age or Fare column with gaps filled; only the rows with a missing value are imputed."""
+        series = df[column]
+        groups = self.age_group_medians_
+        if not series.hasnans:
+            return series
+        missing = series.isna().to_numpy()
+        if column in self.knn_imputers_:
+            fills = self.knn_imputers_[column].predict(
+                knn_matrix(df.loc[missing, KNN_FEATURES], {'Age': self.age_mean_, 'Fare': self.fare_median_}))
+        elif column == 'Age' and groups is not None and set(groups.index.names) <= set(df.columns):
+            fills = lookup_groups(groups, df.loc[missing, list(groups.index.names)])
+            fills = np.where(np.isnan(fills), self.age_mean_, fills)
+        else:
+            return series.fillna(self.age_mean_ if column == 'Age' else self.fare_median_)
+        values = series.to_numpy(copy=True)
+        values[missing] = fills
+        return pd.Series(values, index=series.index, name=column)
+
+    def knn_report(self):
+        """Index size, build time and query totals of each KNN imputer, or None without them."""
+        if not self.knn_imputers_:
+            return None
+        return pd.DataFrame({column: {
+            'index rows': len(imputer.values_),
+            'build (s)': imputer.build_seconds_,
+            'queried rows': imputer.query_rows_,
+            'query (s)': imputer.query_seconds_,
+        } for column, imputer in self.knn_imputers_.items()}).T
+
+    def ticket_group_sizes(self, df):
+        """Training-data passenger count of each row's ticket, looked up once per distinct ticket."""
+        if 'Ticket' not in df.columns:
+            return np.ones(len(df), dtype='int32')
+        tickets = df['Ticket'].astype('category')
+        sizes = self.ticket_counts_.reindex(tickets.cat.categories).fillna(1).to_numpy('int32')
+        # Missing tickets (code -1) take the trailing 1.
+        return np.append(sizes, np.int32(1))[tickets.cat.codes.to_numpy()]
+
+def train_model(train_features, warm_start=None, params=None):
+    """Trains the Logistic Regression model and splits the data.
+
+    With `warm_start` (a `ModelManager` state), the fit starts from those coefficients
+    instead of zero; they are matched to the feature columns by name and new columns start at 0.
+    `params` (e.g. from `tune_hyperparameters`) override the LogisticRegression defaults.
+    """
+    X = train_features.X
+    y = train_features.y
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.30, random_state=42)
     
-    model = LogisticRegression(max_iter=1000)
+    model = LogisticRegression(max_iter=1000, **(params or {}))
+    if warm_start is not None:
+        coef = pd.Series(warm_start['coef'], index=warm_start['columns'])
+        model.set_params(warm_start=True)
+        model.coef_ = coef.reindex(train_features.columns, fill_value=0.0).to_numpy()[np.newaxis, :]
+        model.intercept_ = np.array([warm_start['intercept']])
     model.fit(X_train, y_train)
     
     return model, X_test, y_test
 
+def warm_start_state(model, columns):
+    """The coefficients of a fitted model by feature column, for `train_model(warm_start=...)`."""
+    return {'columns': list(columns), 'coef': model.coef_[0].copy(), 'intercept': float(model.intercept_[0])}
+
+class ModelManager:
+    """Keeps the last fitted coefficients of every dataset lineage and warm-starts refits from them.
+
+    A lineage is an upload plus every later upload that appends rows to it (see
+    `find_appended_parent`). States are kept per lineage and parameters, so models with
+    other parameters never share coefficients, and a fit only starts warm when the lineage
+    has grown since its last fit. A state also records the lineage's last cold fit, and warm
+    fits are reported against it, so nothing is fitted twice just for the comparison.
+    """
+
+    def state_name(self, lineage_id, params):
+        digest = hashlib.sha256(json.dumps(params or {}, sort_keys=True).encode()).hexdigest()[:16]
+        return f"{lineage_id}-{digest}"
+
+    def state(self, lineage_id, params=None):
+        return load_artifact(MODELS_KEY, self.state_name(lineage_id, params))
+
+    def train(self, lineage_id, train_features, params=None):
+        """`train_model`, warm when the lineage has grown since its last fit; returns its result and a report."""
+        rows = len(train_features.y)
+        state = self.state(lineage_id, params)
+        # States without a recorded cold fit have nothing to compare with, so they are refitted cold.
+        if state is not None and (state['rows'] >= rows or 'cold' not in state):
+            state = None
+        start = time.perf_counter()
+        model, X_test, y_test = train_model(train_features, warm_start=state, params=params)
+        seconds = time.perf_counter() - start
+        iterations = int(model.n_iter_[0])
+        cold = state['cold'] if state is not None else {'iterations': iterations, 'seconds': seconds, 'rows': rows}
+        save_artifact(MODELS_KEY, self.state_name(lineage_id, params),
+                      {**warm_start_state(model, train_features.columns), 'rows': rows, 'cold': cold})
+        report = {'warm': state is not None, 'iterations': iterations, 'seconds': seconds, 'rows': rows}
+        if state is not None:
+            # An iteration costs time in proportion to the rows, so the cold time is scaled to this fit's rows.
+            cold_seconds = cold['seconds'] * rows / cold['rows']
+            report.update({
+                'cold iterations': cold['iterations'],
+                'cold seconds': cold_seconds,
+                'cold rows': cold['rows'],
+                'iterations saved': cold['iterations'] - iterations,
+                'seconds saved': cold_seconds - seconds,
+            })
+        return (model, X_test, y_test), report
+
+RegisteredModel = namedtuple('RegisteredModel', ['model', 'preprocessor', 'metadata'])
+
+def split_rows(n_rows):
+    """`train_model`'s 70/30 split as row indices: the same rows `train_test_split` draws for any X of this length."""
+    return train_test_split(np.arange(n_rows), test_size=0.30, random_state=42)
+
+def holdout_mask(n_rows):
+    """`split_rows` as a boolean mask, True for the held-out rows: one byte per row instead of two index arrays."""
+    test = np.zeros(n_rows, dtype=bool)
+    test[split_rows(n_rows)[1]] = True
+    return test
+
+def matrix_chunk_rows(features, chunk_mb):
+    """The number of feature matrix rows that fit in a chunk of `chunk_mb` megabytes."""
+    return max(int(chunk_mb * 1024 ** 2) // (features.X.shape[1] * features.X.itemsize), 1)
+
+def matrix_chunks(n_rows, chunk_rows):
+    """Contiguous row slices of at most `chunk_rows` rows, so a memory-mapped matrix reads each in one sweep."""
+    return [slice(start, min(start + chunk_rows, n_rows)) for start in range(0, n_rows, chunk_rows)]
+
+def holdout_predictions(model, features, chunks, test):
+    """The held-out labels and the model's predictions for them, reading one chunk of the matrix at a time."""
+    y_test = np.concatenate([features.y[rows][test[rows]] for rows in chunks])
+    predictions = np.concatenate([model.predict(features.X[rows][test[rows]]) for rows in chunks if test[rows].any()])
+    return y_test, predictions
+
+def registry_name(data_key, trainer, params):
+    """Registry address of a model: the dataset key (data hash, pipeline version and imputer),
+    then the trainer and a digest of its hyperparameters."""
+    digest = hashlib.sha256(json.dumps(params or {}, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{data_key}/{trainer}-{digest}"
+
+def estimator_state(estimator):
+    """An estimator (or pipeline) as its class, parameters and fitted arrays, without pickling sklearn objects."""
+    if hasattr(estimator, 'steps'):
+        return {'steps': [estimator_state(step) for _, step in estimator.steps]}
+    return {'class': type(estimator).__name__, 'params': estimator.get_params(),
+            'fitted': {name: getattr(estimator, name) for name in REGISTRY_FITTED_ATTRIBUTES if hasattr(estimator, name)}}
+
+def restore_estimator(state):
+    """Rebuilds a fitted estimator from `estimator_state`; predictions match the original exactly."""
+    if 'steps' in state:
+        return make_pipeline(*[restore_estimator(step) for step in state['steps']])
+    estimator = REGISTRY_ESTIMATORS[state['class']](**state['params'])
+    for name, value in state['fitted'].items():
+        setattr(estimator, name, value)
+    return estimator
+
+class ModelRegistry:
+    """On-disk registry of fitted models, so a dataset is never trained twice for the same parameters.
+
+    Models are addressed by `registry_name` and stored as `estimator_state` (a few KB of
+    coefficients) with their metadata; the fitted preprocessor is stored once per dataset key.
+    Loaded entries stay in memory, and `model_registry` shares one registry between every
+    session, so after a restart each model is read from disk once instead of being refitted.
+    The metadata of entries that were only listed, not loaded, is kept in memory as well.
+    """
+
+    def __init__(self, key=REGISTRY_KEY):
+        self.key = key
+        self.entries = {}
+        self.preprocessors = {}
+        self.entry_metadata = {}
+
+    def preprocessor(self, data_key):
+        """The fitted preprocessor registered with the dataset's models, or None if none was trained."""
+        if self.preprocessors.get(data_key) is None:
+            self.preprocessors[data_key] = load_artifact(self.key, f'{data_key}/preprocessor')
+        return self.preprocessors[data_key]
+
+    def load(self, name):
+        """The registered model, or None if it was never trained."""
+        if name not in self.entries:
+            state = load_artifact(self.key, name)
+            preprocessor = self.preprocessor(name.split('/')[0])
+            if state is None or preprocessor is None:
+                return None
+            self.entries[name] = RegisteredModel(restore_estimator(state['estimator']), preprocessor, state['metadata'])
+        return self.entries[name]
+
+    def register(self, name, model, preprocessor, metadata):
+        """Stores a fitted model; the preprocessor goes first, so a readable model entry is always complete."""
+        data_key = name.split('/')[0]
+        if self.preprocessor(data_key) is None:
+            save_artifact(self.key, f'{data_key}/preprocessor', preprocessor)
+        save_artifact(self.key, name, {'estimator': estimator_state(model), 'metadata': metadata})
+        self.preprocessors[data_key] = preprocessor
+        self.entries[name] = RegisteredModel(model, preprocessor, metadata)
+        return self.entries[name]
+
+    def train(self, data_key, trainer, params, preprocessor, train_features, train, chunk_mb=DEFAULT_CHUNK_MB):
+        """`train()`'s (model, y_test, predictions), loaded instead if this dataset, trainer and params were trained before.
+
+        `y_test` and `predictions` are the held-out rows of `train_model`'s split; a loaded model
+        predicts them chunk by chunk (`chunk_mb` per chunk), so the hold-out is never copied whole.
+        Returns them with the registry entry and a report of whether it was loaded and how long that took.
+        """
+        name = registry_name(data_key, trainer, params)
+        start = time.perf_counter()
+        entry = self.load(name)
+        if entry is not None:
+            report = {'name': name, 'loaded': True, 'seconds': time.perf_counter() - start}
+            n_rows = len(train_features.y)
+            chunks = matrix_chunks(n_rows, matrix_chunk_rows(train_features, chunk_mb))
+            return (entry.model, *holdout_predictions(entry.model, train_features, chunks, holdout_mask(n_rows))), entry, report
+        model, y_test, predictions = train()
+        seconds = time.perf_counter() - start
+        entry = self.register(name, model, preprocessor, {
+            'dataset': data_key,
+            'pipeline version': PIPELINE_VERSION,
+            'imputer': preprocessor.imputer,
+            'trainer': trainer,
+            'params': params or {},
+            'columns': list(train_features.columns),
+            'rows': len(train_features.y),
+            'accuracy': float(np.mean(predictions == y_test)),
+            'training seconds': seconds,
+            'trained at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        })
+        return (model, y_test, predictions), entry, {'name': name, 'loaded': False, 'seconds': seconds}
+
+    def entry_metadata_of(self, name):
+        """A registered model's metadata, from memory when the entry was loaded or listed before."""
+        if name in self.entries:
+            return self.entries[name].metadata
+        if name not in self.entry_metadata:
+            state = load_artifact(self.key, name)
+            if state is None:
+                return None
+            self.entry_metadata[name] = state['metadata']
+        return self.entry_metadata[name]
+
+    def metadata(self):
+        """The metadata of every registered model (parameters as JSON), newest first.
+
+        Only the directory is listed on every call; each entry is unpickled at most once.
+        """
+        names = [f'{path.parent.name}/{path.stem}' for path in (CACHE_DIR / self.key).glob('*/*.pkl')
+                 if path.stem != 'preprocessor']
+        metadata = {name: self.entry_metadata_of(name) for name in names}
+        rows = [{'name': name, **entry, 'params': json.dumps(entry['params'], sort_keys=True)}
+                for name, entry in metadata.items() if entry is not None]
+        if not rows:
+            return pd.DataFrame(columns=['name'])
+        return pd.DataFrame(rows).sort_values('trained at', ascending=False, ignore_index=True)
+
+def train_streaming(data_key, train_features, chunk_mb=DEFAULT_CHUNK_MB, epochs=STREAMING_EPOCHS,
+                    checkpoint_name='model-streaming-checkpoint'):
+    """Trains logistic regression by SGD over chunks of the stored matrix, on `train_model`'s split.
+
+    The matrix is read in contiguous chunks of `chunk_mb`, and `holdout_mask` picks the
+    training and held-out rows out of each. One pass fits a StandardScaler with `partial_fit`,
+    then every epoch feeds the chunks' training rows, in a fresh random chunk order, to
+    `SGDClassifier(loss='log_loss').partial_fit`, and predicts their held-out rows. Besides one
+    chunk, only the mask (a byte per row) and the held-out labels and predictions are in
+    memory; the held-out features are never copied whole. A checkpoint is stored after every epoch and an interrupted run
+    resumes from it. Returns (model, y_test, predictions) for the held-out rows and a report
+    with the held-out accuracy after every epoch.
+    """
+    n_rows = len(train_features.y)
+    test = holdout_mask(n_rows)
+    chunk_rows = matrix_chunk_rows(train_features, chunk_mb)
+    # Chunks that are all held out have nothing to train on.
+    chunks = matrix_chunks(n_rows, chunk_rows)
+    train_chunks = [rows for rows in chunks if not test[rows].all()]
+    start = time.perf_counter()
+    checkpoint = load_artifact(data_key, checkpoint_name)
+    if checkpoint is None:
+        scaler = StandardScaler()
+        for rows in train_chunks:
+            scaler.partial_fit(train_features.X[rows][~test[rows]])
+        checkpoint = {'epoch': 0, 'scaler': scaler, 'accuracy': [],
+                      'classifier': SGDClassifier(loss='log_loss', random_state=42),
+                      'rng': np.random.default_rng(42).bit_generator.state}
+    resumed_from = checkpoint['epoch']
+    rng = np.random.default_rng()
+    rng.bit_generator.state = checkpoint['rng']
+    model = make_pipeline(checkpoint['scaler'], checkpoint['classifier'])
+    holdout = None
+    for epoch in range(checkpoint['epoch'], epochs):
+        for i in rng.permutation(len(train_chunks)):
+            rows = train_chunks[i]
+            X = checkpoint['scaler'].transform(train_features.X[rows][~test[rows]])
+            checkpoint['classifier'].partial_fit(X, train_features.y[rows][~test[rows]], classes=[0, 1])
+        holdout = holdout_predictions(model, train_features, chunks, test)
+        checkpoint['accuracy'].append(float(np.mean(holdout[1] == holdout[0])))
+        checkpoint.update(epoch=epoch + 1, rng=rng.bit_generator.state)
+        save_artifact(data_key, checkpoint_name, checkpoint)
+    if holdout is None:
+        holdout = holdout_predictions(model, train_features, chunks, test)
+    report = {'epochs': epochs, 'resumed from epoch': resumed_from, 'chunk rows': chunk_rows,
+              'chunks per epoch': len(train_chunks), 'seconds': time.perf_counter() - start,
+              'epoch accuracy': checkpoint['accuracy'], 'accuracy': checkpoint['accuracy'][-1]}
+    return (model, *holdout), report
+
+def tuning_grid(c_values, solvers):
+    """The LogisticRegression parameters of every (C, solver/penalty) combination."""
+    return [{'C': float(c), **TUNING_SOLVERS[solver]} for solver in solvers for c in c_values]
+
+def tuning_folds(y):
+    """Stratified folds over the rows `train_model` trains on, so tuning never sees its held-out split."""
+    rows, _ = train_test_split(np.arange(len(y)), test_size=0.30, random_state=42)
+    folds = StratifiedKFold(TUNING_FOLDS, shuffle=True, random_state=42).split(rows, y[rows])
+    return [(rows[fit], rows[validate]) for fit, validate in folds]
+
+def tuning_budgets(n_rows):
+    """Training rows per successive-halving round; they depend only on the data, not on the grid."""
+    return [max(n_rows // TUNING_FACTOR ** (TUNING_ROUNDS - 1 - r), 1) for r in range(TUNING_ROUNDS)]
+
+def tuning_result_name(params, fold, budget):
+    """Artifact name of one memoized (params, fold, budget) score under the dataset key."""
+    digest = hashlib.sha256(json.dumps([params, fold, budget], sort_keys=True).encode()).hexdigest()
+    return f"tuning/{digest[:32]}"
+
+def fit_rows(model, features, rows):
+    """Fits `model` on the given rows of a feature matrix, without convergence warnings."""
+    with warnings.catch_warnings():
+        # Unconverged fits just score lower.
+        warnings.simplefilter('ignore', ConvergenceWarning)
+        return model.fit(features.X[rows], features.y[rows])
+
+def evaluate_candidate(data_key, params, fold, budget):
+    """Validation accuracy of `params` fit on the first `budget` rows of a fold (runs in a worker process).
+
+    The stored feature matrix is memory-mapped, so workers share it instead of receiving a copy.
+    """
+    features = load_matrix(data_key, 'train_features')
+    train_rows, validate_rows = tuning_folds(features.y)[fold]
+    model = fit_rows(LogisticRegression(max_iter=1000, **params), features, train_rows[:budget])
+    return float(model.score(features.X[validate_rows], features.y[validate_rows]))
+
+def tune_hyperparameters(data_key, train_features, c_values, solvers, workers=TUNING_WORKERS):
+    """Successive-halving search over `tuning_grid(c_values, solvers)` with cross-validated accuracy.
+
+    Every round scores the remaining candidates on all folds with the round's row budget,
+    then keeps the best 1/TUNING_FACTOR. Each (params, fold, budget) score is stored under
+    the dataset key, so a rerun or a wider grid only fits the points it has not seen; the
+    rest run in a process pool. Returns the best parameters, a leaderboard (every candidate's
+    scores in the last round it reached) and how many fits were trained or reused.
+    """
+    candidates = tuning_grid(c_values, solvers)
+    budgets = tuning_budgets(len(tuning_folds(train_features.y)[0][0]))
+    results = {}
+    counts = {'trained fits': 0, 'cached fits': 0}
+    for round_number, budget in enumerate(budgets, 1):
+        tasks = [(params, fold) for params in candidates for fold in range(TUNING_FOLDS)]
+        scores = [load_artifact(data_key, tuning_result_name(params, fold, budget)) for params, fold in tasks]
+        missing = [i for i, score in enumerate(scores) if score is None]
+        new_scores = process_map(evaluate_candidate, [data_key] * len(missing), [tasks[i][0] for i in missing],
+                                 [tasks[i][1] for i in missing], [budget] * len(missing), workers=workers)
+        for i, score in zip(missing, new_scores):
+            save_artifact(data_key, tuning_result_name(*tasks[i], budget), score)
+            scores[i] = score
+        counts['trained fits'] += len(missing)
+        counts['cached fits'] += len(tasks) - len(missing)
+
+        scores = np.reshape(scores, (len(candidates), TUNING_FOLDS))
+        for params, fold_scores in zip(candidates, scores):
+            results[json.dumps(params, sort_keys=True)] = {
+                'C': params['C'], 'solver': params['solver'], 'penalty': 'l1' if params['l1_ratio'] else 'l2',
+                'round': round_number, 'rows': budget, 'accuracy': fold_scores.mean(), 'std': fold_scores.std()}
+        order = np.argsort(-scores.mean(axis=1), kind='stable')
+        candidates = [candidates[i] for i in order[:max(len(candidates) // TUNING_FACTOR, 1)]]
+    leaderboard = pd.DataFrame(list(results.values())).sort_values(['round', 'accuracy'], ascending=False,
+                                                                    ignore_index=True)
+    return candidates[0], leaderboard, counts
+
+def cv_folds(y):
+    """Row indices of every stratified cross-validation fold, as (train rows, validation rows)."""
+    return list(StratifiedKFold(CV_FOLDS, shuffle=True, random_state=42).split(np.zeros(len(y)), y))
+
+def cross_validate_fold(data_key, params, train_rows, validate_rows):
+    """Fits one fold from the memory-mapped feature matrix and scores it (runs in a worker process)."""
+    features = load_matrix(data_key, 'train_features')
+    predictions = fit_rows(LogisticRegression(**params), features, train_rows).predict(features.X[validate_rows])
+    y = features.y[validate_rows]
+    return predictions, {name: float(metric(y, predictions)) for name, metric in CV_METRICS.items()}
+
+def cross_validate_model(data_key, model, train_features, workers=CV_WORKERS):
+    """Stratified k-fold cross-validation of `model`'s parameters on the stored training matrix.
+
+    The folds are fitted concurrently in a process pool. Workers receive only the fold's row
+    indices and read the rows from the shared memory map. Returns the per-fold metrics, the
+    out-of-fold predictions of every row and the wall time.
+    """
+    params = {**model.get_params(), 'warm_start': False}
+    folds = cv_folds(train_features.y)
+    start = time.perf_counter()
+    results = process_map(cross_validate_fold, [data_key] * len(folds), [params] * len(folds),
+                          [train_rows for train_rows, _ in folds], [rows for _, rows in folds], workers=workers)
+    seconds = time.perf_counter() - start
+    predictions = np.empty(len(train_features.y), dtype=train_features.y.dtype)
+    for (_, validate_rows), (fold_predictions, _) in zip(folds, results):
+        predictions[validate_rows] = fold_predictions
+    metrics = pd.DataFrame([fold_metrics for _, fold_metrics in results],
+                           index=pd.RangeIndex(1, len(folds) + 1, name='fold'))
+    return {'folds': metrics, 'predictions': predictions, 'seconds': seconds, 'workers': min(workers, len(folds))}
+
+def file_sha256(file, size=None):
+    """SHA-256 of the first `size` bytes of an upload (all of it by default)."""
+    return hashlib.sha256(memoryview(file.getvalue())[:size]).hexdigest()
+
+def load_lineage(key):
+    """The lineage record of a dataset key, or None if it has none."""
+    try:
+        return json.loads((CACHE_DIR / key / 'lineage.json').read_text())
+    except (OSError, ValueError):
+        return None
+
+def record_lineage(key, train_file, test_file, imputer='group', lineage_id=None, partitioned=False):
+    """Remembers which raw uploads produced a dataset key, for append detection.
+
+    `lineage_id` names the chain of appended uploads the key belongs to (the key itself for a new one).
+    """
+    path = CACHE_DIR / key / 'lineage.json'
+    if path.exists() or upload_format(train_file) != 'csv' or upload_compression(train_file):
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'pipeline_version': PIPELINE_VERSION,
+        'imputer': imputer,
+        'partitioned': partitioned,
+        'lineage_id': lineage_id or key,
+        'train_size': train_file.size,
+        'train_sha256': file_sha256(train_file),
+        'test_sha256': file_sha256(test_file),
+    }))
+
+def find_appended_parent(train_file, imputer='group', partitioned=False):
+    """Finds the largest stored train.csv, processed with `imputer` and the same preprocessing mode,
+    that the upload extends by whole rows.
+
+    Returns `(parent_key, lineage)` or None.
+    """
+    if upload_format(train_file) != 'csv' or upload_compression(train_file):
+        return None
+    data = train_file.getvalue()
+    best = None
+    for path in CACHE_DIR.glob('*/lineage.json'):
+        lineage = load_lineage(path.parent.name)
+        if lineage is None:
+            continue
+        size = lineage['train_size']
+        settings = (lineage['pipeline_version'], lineage['imputer'], lineage['partitioned'])
+        if settings != (PIPELINE_VERSION, imputer, partitioned) or not 0 < size < len(data):
+            continue
+        if data[size - 1:size] != b"\n" or (best is not None and size <= best[1]['train_size']):
+            continue
+        if file_sha256(train_file, size) == lineage['train_sha256']:
+            best = (path.parent.name, lineage)
+    return best
+
+def read_csv_suffix(file, offset, columns=None):
+    """Parses only the rows after byte `offset` of a CSV, reusing its header row."""
+    usecols = None if columns is None else (lambda name: name in columns)
+    suffix = io.BytesIO(memoryview(file.getvalue())[offset:])
+    return engineer_features(pd.read_csv(suffix, header=None, names=csv_header(file), usecols=usecols,
+                                         dtype=PARSE_DTYPES))
+
+def ingest_appended_rows(data_key, parent_key, lineage, train_file, test_file, csv_backend='auto'):
+    """Stores the artifacts for an upload that appends rows to an already processed train.csv.
+
+    Only the new rows are parsed and preprocessed (all rows if they change a vocabulary), and
+    the imputation statistics are updated from the delta; `run_pipeline` then refits the model warm from the lineage's last coefficients. Returns
+    False if the parent's artifacts are incomplete or the new test.csv has no valid rows, in which
+    case the full pipeline runs instead.
+    """
+    parent_train = load_frame(parent_key, 'train')
+    parent_quarantine = load_frame(parent_key, 'train_quarantine')
+    parent_processed = load_frame(parent_key, 'train_processed')
+    parent_preprocessor = load_artifact(parent_key, 'preprocessor')
+    parent_artifacts = (parent_train, parent_quarantine, parent_processed, parent_preprocessor)
+    if any(artifact is None for artifact in parent_artifacts):
+        return False
+
+    delta_df = read_csv_suffix(train_file, lineage['train_size'], PIPELINE_COLUMNS)
+    delta_df, delta_quarantine = validate_frame(delta_df, True, train_file.name)
+    train_df, train_memory = optimize_dtypes(apply_compact_dtypes(pd.concat([parent_train, delta_df], ignore_index=True)))
+    train_quarantine = pd.concat([parent_quarantine, delta_quarantine], ignore_index=True)
+    if file_sha256(test_file) == lineage['test_sha256']:
+        test_df = load_frame(parent_key, 'test')
+        test_quarantine = load_frame(parent_key, 'test_quarantine')
+        test_memory = load_artifact(parent_key, 'memory_report')['test']
+    else:
+        test_df = read_upload(test_file, PIPELINE_COLUMNS, csv_backend)
+        test_df, test_quarantine = validate_frame(test_df, False, test_file.name)
+        if test_df.empty:
+            # The full pipeline reports the upload's quarantine instead.
+            return False
+        test_df, test_memory = optimize_dtypes(test_df)
+    preprocessor = copy.deepcopy(parent_preprocessor).update(delta_df, train_df)
+
+    test_processed = preprocessor.transform(test_df)
+    if preprocessor.vocabularies() != parent_preprocessor.vocabularies():
+        # New categories add one-hot columns to every row, so the old rows are transformed again.
+        train_processed = preprocessor.transform(train_df)
+    else:
+        train_processed = pd.concat([parent_processed, preprocessor.transform(delta_df)], ignore_index=True)
+        # Old rows imputed with the parent's statistics are refilled with the updated ones.
+        for column in ('Age', 'Fare'):
+            train_processed[column] = preprocessor.impute(train_df, column).to_numpy()
+        # Appended rows can join existing ticket groups.
+        if 'TicketGroupSize' in train_processed.columns:
+            train_processed['TicketGroupSize'] = preprocessor.ticket_group_sizes(train_df)
+
+    save_frame(data_key, 'train', train_df)
+    save_frame(data_key, 'test', test_df)
+    save_frame(data_key, 'train_quarantine', train_quarantine)
+    save_frame(data_key, 'test_quarantine', test_quarantine)
+    save_artifact(data_key, 'memory_report', {'train': train_memory, 'test': test_memory})
+    save_artifact(data_key, 'preprocessor', preprocessor)
+    save_frame(data_key, 'train_processed', train_processed)
+    save_frame(data_key, 'test_processed', test_processed)
+    save_matrix(data_key, 'train_features', build_feature_matrix(train_processed))
+    save_matrix(data_key, 'test_features', build_feature_matrix(test_processed))
+    return True
+
+def preprocess_partition(data_key, source, destination):
+    """Preprocesses one raw Parquet partition into `destination` (runs in a worker process).
+
+    The fitted preprocessor is read from the store by key rather than pickled into every task.
+    """
+    preprocessor = load_artifact(data_key, 'preprocessor')
+    write_partition(preprocessor.transform(read_partition(source)), destination)
+
+def write_raw_partitions(file, require_target, directory, chunk_mb, quarantines, reports):
+    """Validates an upload chunk by chunk, writing each clean chunk as a raw Parquet partition.
+
+    Yields the clean chunks (for fitting) and appends each chunk's quarantined rows and
+    memory report to `quarantines` and `reports`.
+    """
+    for i, chunk in enumerate(iter_upload_chunks(file, chunk_mb, PIPELINE_COLUMNS)):
+        clean, quarantine = validate_frame(chunk, require_target, file.name)
+        clean, report = optimize_dtypes(clean)
+        write_partition(clean, directory / f"part-{i:05d}.parquet")
+        quarantines.append(quarantine)
+        reports.append(report)
+        yield clean
+
+def merge_memory_reports(reports, df):
+    """Sums per-chunk `optimize_dtypes` reports; the dtypes after are those of the assembled frame."""
+    report = pd.concat(reports).groupby(level=0, sort=False).agg(
+        {'dtype before': 'first', 'dtype after': 'last', 'bytes before': 'sum', 'bytes after': 'sum'})
+    report['dtype after'] = df.dtypes.astype(str)
+    report['bytes after'] = df.memory_usage(index=False, deep=True)
+    return report
+
+def ingest_partitioned(data_key, train_file, test_file, chunk_mb=DEFAULT_CHUNK_MB, workers=PARTITION_WORKERS,
+                       imputer='group'):
+    """Stores the artifacts for uploads processed out of core, one partition at a time.
+
+    1. One streaming pass validates every chunk, writes it as a raw Parquet partition and
+       feeds the global imputation statistics (`fit_chunks`).
+    2. The fitted preprocessor is stored, and a process pool preprocesses the raw partitions
+       into processed Parquet partitions with it; workers load it by key.
+    3. The memory-mapped frames and feature matrices are assembled from the partitions.
+
+    No step holds more than about one partition per process in memory, so the data only
+    has to fit on disk. The Fare median comes from the quantile sketch, not an exact sort.
+    """
+    if pa is None:
+        raise ImportError("Out-of-core preprocessing requires pyarrow (pip install pyarrow).")
+    root = CACHE_DIR / data_key / 'partitions'
+    tmp_root = make_tmp_directory(root)
+    quarantines = {'train': [], 'test': []}
+    reports = {'train': [], 'test': []}
+    try:
+        preprocessor = TitanicPreprocessor(imputer=imputer).fit_chunks(write_raw_partitions(
+            train_file, True, tmp_root / 'train' / 'raw', chunk_mb, quarantines['train'], reports['train']))
+        for _ in write_raw_partitions(test_file, False, tmp_root / 'test' / 'raw', chunk_mb,
+                                      quarantines['test'], reports['test']):
+            pass
+        for name, file in (('train', train_file), ('test', test_file)):
+            n_rows = sum(pa.parquet.ParquetFile(path).metadata.num_rows
+                         for path in (tmp_root / name / 'raw').glob('part-*.parquet'))
+            check_clean_rows(n_rows, pd.concat(quarantines[name], ignore_index=True), file.name)
+
+        save_artifact(data_key, 'preprocessor', preprocessor)
+        sources = sorted(tmp_root.glob('*/raw/part-*.parquet'))
+        destinations = [tmp_root / source.parent.parent.name / 'processed' / source.name for source in sources]
+        process_map(preprocess_partition, [data_key] * len(sources), sources, destinations, workers=workers)
+        publish_directory(tmp_root, root)
+    finally:
+        shutil.rmtree(tmp_root, ignore_errors=True)
+
+    memory_report = {}
+    for name in ('train', 'test'):
+        save_frame_partitions(data_key, name, partition_paths(data_key, name, 'raw'))
+        save_frame(data_key, f'{name}_quarantine', pd.concat(quarantines[name], ignore_index=True))
+        memory_report[name] = merge_memory_reports(reports[name], load_frame(data_key, name))
+        save_frame_partitions(data_key, f'{name}_processed', partition_paths(data_key, name, 'processed'))
+        save_matrix_partitions(data_key, f'{name}_features', partition_paths(data_key, name, 'processed'))
+    save_artifact(data_key, 'memory_report', memory_report)
+    # Partitions are transformed by stored copies, so KNN queries are not counted here, only the index build.
+    save_artifact(data_key, 'imputation_report', preprocessor.knn_report())
+
+@st.cache_resource
+def model_registry():
+    """The model registry shared by every session; models stay loaded for the lifetime of the server."""
+    return ModelRegistry()
+
+@st.cache_resource(show_spinner="Running pipeline...")
+def run_pipeline(data_key, _train_file, _test_file, chunk_mb=DEFAULT_CHUNK_MB, csv_backend='auto', append_aware=True,
+                 engine='auto', partitioned=False, imputer='group', tuning=None, cross_validate=False,
+                 trainer='in-memory'):
+    """Parses, preprocesses and trains once per dataset key, reusing on-disk artifacts.
+
+    Only `data_key` and the ingestion options are hashed by Streamlit; the uploads are
+    addressed by their content hash instead. The result is shared by every session and
+    its frames are read-only memory maps, so callers must not modify them.
+
+    With `append_aware`, an upload that extends a previously processed train.csv only
+    processes the appended rows (see `ingest_appended_rows`); either way, its model starts warm
+    from the last fit of the upload it extends (see `ModelManager`). `engine` only changes how the
+    frames are computed, not the result, so stored artifacts are shared between engines.
+    With `partitioned`, uploads are preprocessed out of core (see `ingest_partitioned`); appended
+    uploads are then preprocessed in full, as `ingest_appended_rows` re-selects exact medians.
+    `imputer` and `partitioned` change the results, so `data_key` must come from
+    `dataset_key(..., imputer=imputer, partitioned=partitioned)`.
+    With `tuning` (C values and `TUNING_SOLVERS` names), the model is trained with the best
+    parameters of `tune_hyperparameters`; tuned models are stored per grid. With
+    `cross_validate`, the model's parameters are also scored by `cross_validate_model`.
+    With `trainer='streaming'`, the model is trained out of core by `train_streaming` instead
+    (tuning and cross-validation only apply to the in-memory trainer). Fitted models are kept in
+    the `ModelRegistry`, so a dataset, trainer and parameters seen before are loaded, not refitted.
+    """
+    if engine == 'auto':
+        engine = default_engine(_train_file, _test_file)
+    lineage = load_lineage(data_key)
+    parent = find_appended_parent(_train_file, imputer, partitioned) if lineage is None else None
+    if append_aware and not partitioned and parent is not None and load_frame(data_key, 'train') is None:
+        ingest_appended_rows(data_key, *parent, _train_file, _test_file, csv_backend)
+    # Models are warm-started within a lineage: this upload plus the uploads it appends to.
+    if lineage is not None:
+        lineage_id = lineage['lineage_id']
+    else:
+        lineage_id = data_key if parent is None else parent[1]['lineage_id']
+    if partitioned and load_frame(data_key, 'train') is None:
+        try:
+            ingest_partitioned(data_key, _train_file, _test_file, chunk_mb, imputer=imputer)
+        except Exception as e:
+            st.error(f"Error loading data: {e}")
+            return None
+
+    def build_frames():
+        train_df, test_df, train_quarantine, test_quarantine = load_data(
+            _train_file, _test_file, PIPELINE_COLUMNS, csv_backend, engine)
+        if train_df is None:
+            return None, None, None, None
+        train_df, train_memory = optimize_dtypes(train_df)
+        test_df, test_memory = optimize_dtypes(test_df)
+        save_artifact(data_key, 'memory_report', {'train': train_memory, 'test': test_memory})
+        return train_df, test_df, train_quarantine, test_quarantine
+
+    frames = cached_frames(data_key, ['train', 'test', 'train_quarantine', 'test_quarantine'], build_frames)
+    if frames is None:
+        return None
+    train_df, test_df, train_quarantine, test_quarantine = frames
+
+    registry = model_registry()
+    # The registry keeps the preprocessor of every trained dataset in memory; it is the stored one.
+    preprocessor = registry.preprocessor(data_key)
+    if preprocessor is None:
+        preprocessor = cached_artifact(data_key, 'preprocessor',
+                                       lambda: TitanicPreprocessor(engine=engine, imputer=imputer).fit(train_df))
+
+    def build_processed():
+        processed = preprocessor.transform(train_df), preprocessor.transform(test_df)
+        save_artifact(data_key, 'imputation_report', preprocessor.knn_report())
+        return processed
+
+    train_processed, test_processed = cached_frames(data_key, ['train_processed', 'test_processed'], build_processed)
+    train_features, test_features = cached_matrices(
+        data_key, ['train_features', 'test_features'],
+        lambda: (build_feature_matrix(train_processed), build_feature_matrix(test_processed)))
+    def tuned_params(name, tuning):
+        def tune():
+            start = time.perf_counter()
+            params, leaderboard, fit_counts = tune_hyperparameters(data_key, train_features, *tuning)
+            return {'leaderboard': leaderboard, 'params': params, 'seconds': time.perf_counter() - start, **fit_counts}
+
+        return None if tuning is None else cached_artifact(data_key, f'{name}-tuning', tune)['params']
+
+    def train_in_memory(name, params):
+        def train():
+            (model, X_test, y_test), training_report = ModelManager().train(lineage_id, train_features, params)
+            save_artifact(data_key, f'{name}-training_report', training_report)
+            return model, y_test, model.predict(X_test)
+
+        return registry.train(data_key, 'in-memory', params, preprocessor, train_features, train, chunk_mb)
+
+    def train_out_of_core(name):
+        def train():
+            model, streaming_report = train_streaming(data_key, train_features, chunk_mb,
+                                                      checkpoint_name=f'{name}-checkpoint')
+            if train_features.X.nbytes <= IN_MEMORY_COMPARISON_MAX_BYTES:
+                # Both are scored on the same held-out rows, so the registry's accuracy compares directly.
+                streaming_report['in-memory accuracy'] = train_in_memory('model', None)[1].metadata['accuracy']
+            save_artifact(data_key, f'{name}-streaming_report', streaming_report)
+            return model
+
+        return registry.train(data_key, 'streaming', {'epochs': STREAMING_EPOCHS}, preprocessor, train_features, train,
+                              chunk_mb)
+
+    if trainer == 'streaming':
+        tuning, cross_validate = None, False
+        model_name = 'model-streaming'
+        (model, y_test, y_pred), registered, registry_report = train_out_of_core(model_name)
+    else:
+        model_name = 'model'
+        if tuning is not None:
+            model_name = f"model-tuned-{hashlib.sha256(json.dumps(tuning).encode()).hexdigest()[:16]}"
+        (model, y_test, y_pred), registered, registry_report = train_in_memory(model_name, tuned_params(model_name, tuning))
+
+    cv = None
+    if cross_validate:
+        cv = cached_artifact(data_key, f'{model_name}-cv', lambda: cross_validate_model(data_key, model, train_features))
+    projection = cached_artifact(data_key, 'projection', lambda: [
+        projection_report(file, PIPELINE_COLUMNS) for file in (_train_file, _test_file)])
+    record_lineage(data_key, _train_file, _test_file, imputer, lineage_id, partitioned)
+    # Appended uploads only rebuild the KNN index; their report falls back to the build times.
+    imputation_report = load_artifact(data_key, 'imputation_report')
+    return {
+        'train': train_df,
+        'test': test_df,
+        'train_quarantine': train_quarantine,
+        'test_quarantine': test_quarantine,
+        'train_processed': train_processed,
+        'test_processed': test_processed,
+        'train_features': train_features,
+        'test_features': test_features,
+        'preprocessor': preprocessor,
+        'model': model,
+        'y_test': y_test,
+        'y_pred': y_pred,
+        'projection': projection,
+        'statistics': cached_artifact(data_key, 'statistics', lambda: statistics_report(train_df)),
+        'correlation': cached_artifact(data_key, 'feature_correlation', lambda: feature_correlation(train_features)),
+        'memory_report': load_artifact(data_key, 'memory_report'),
+        'training_report': load_artifact(data_key, f'{model_name}-training_report'),
+        'tuning': load_artifact(data_key, f'{model_name}-tuning'),
+        'streaming': load_artifact(data_key, f'{model_name}-streaming_report'),
+        'cv': cv,
+        'registry': {**registered.metadata, **registry_report},
+        'imputation_report': preprocessor.knn_report() if imputation_report is None else imputation_report,
+    }
+
+def score_batch(model, preprocessor, df):
+    """Predicts survival for a validated batch of passengers with the fitted pipeline."""
+    features = build_feature_matrix(preprocessor.transform(df))
+    return pd.DataFrame({'PassengerId': features.passenger_id, 'Survived': model.predict(features.X)})
+
+def format_metric(value, spread=None, fmt='.2%'):
+    """Formats a metric, followed by its cross-validation standard deviation if there is one."""
+    return f"{value:{fmt}}" if spread is None else f"{value:{fmt}} ± {spread:{fmt}}"
+
 @st.cache_data
 def convert_df_to_csv(df):
     return df.to_csv(index=False).encode('utf-8')
@@ -76,18 +2271,67 @@ with st.sidebar:
     st.image("Screenshot_25z0.png")
     
     st.header("1. Upload Your Data")
-    st.write("Please upload the `train.csv` and `test.csv` files.")
+    st.write("Please upload the `train.csv` and `test.csv` files (CSV, optionally gzip/zstd/bz2 "
+             "compressed, Parquet, Feather or Arrow).")
     
-    uploaded_train_file = st.file_uploader("Upload train.csv", type="csv")
-    uploaded_test_file = st.file_uploader("Upload test.csv", type="csv")
+    upload_types = UPLOAD_TYPES + list(COMPRESSION_SUFFIXES)
+    uploaded_train_file = st.file_uploader("Upload train.csv", type=upload_types)
+    uploaded_test_file = st.file_uploader("Upload test.csv", type=upload_types)
     
     st.info("[Download the data from Kaggle](https://www.kaggle.com/competitions/titanic/data)")
 
+    st.header("2. Ingestion")
+    chunk_mb = st.number_input("Chunk budget (MB)", min_value=1, value=DEFAULT_CHUNK_MB,
+                               help="Partition size of out-of-core preprocessing and chunk size of the streaming "
+                                    "trainer; together they keep peak memory within the budget instead of the file size.")
+    csv_backend = st.selectbox("CSV parser", CSV_BACKENDS,
+                               help="'auto' uses the C parser below "
+                                    f"{PARALLEL_CSV_THRESHOLD_BYTES // 1024 ** 2} MB and a multi-core parser above.")
+    append_aware = st.checkbox("Append-aware ingestion", value=True,
+                               help="If train.csv is a previous upload plus new rows, only the new rows are processed.")
+    engine = st.selectbox("Dataframe engine", ENGINES,
+                          help="'auto' uses pandas below "
+                               f"{POLARS_THRESHOLD_BYTES // 1024 ** 2} MB and Polars' lazy engine above. "
+                               "Both produce the same features.")
+    partitioned = st.checkbox("Out-of-core preprocessing (partitioned)", value=False,
+                              help="Preprocesses chunk-budget-sized Parquet partitions in a process pool, "
+                                   "for manifests that do not fit in memory.")
+    imputer = st.selectbox("Missing-value imputer", IMPUTERS,
+                           help="'group' fills Age with class/sex/title medians and Fare with the median; "
+                                f"'knn' uses the mean of the {KNN_NEIGHBORS} most similar complete passengers.")
+
+    st.header("3. Model")
+    # The in-memory trainer would load the whole partitioned matrix, so out-of-core preprocessing streams it too.
+    trainer = st.selectbox("Trainer", TRAINERS, index=TRAINERS.index('streaming') if partitioned else 0,
+                           disabled=partitioned,
+                           help=f"'streaming' trains by SGD over chunk-budget-sized chunks read from disk "
+                                f"({STREAMING_EPOCHS} epochs, checkpointed), for matrices that do not fit in memory. "
+                                "Always used with out-of-core preprocessing.")
+    in_memory = trainer == 'in-memory'
+    tune = st.checkbox("Tune hyperparameters", value=False, disabled=not in_memory,
+                       help=f"Successive halving over C and solver/penalty with {TUNING_FOLDS}-fold cross-validation "
+                            "in a process pool. Results are cached, so widening the grid only trains the new points.")
+    tuning = None
+    if tune and in_memory:
+        tuning_c_values = st.multiselect("C values", TUNING_C_VALUES, default=DEFAULT_TUNING_C_VALUES)
+        tuning_solvers = st.multiselect("Solver / penalty", list(TUNING_SOLVERS), default=list(TUNING_SOLVERS))
+        if tuning_c_values and tuning_solvers:
+            tuning = (sorted(tuning_c_values), sorted(tuning_solvers))
+    cross_validate = st.checkbox(f"Cross-validate ({CV_FOLDS}-fold)", value=False, disabled=not in_memory,
+                                 help="Evaluates with stratified k-fold cross-validation instead of the single "
+                                      "70/30 split, fitting the folds in parallel.")
+
 # --- Main Application ---
 if uploaded_train_file is not None and uploaded_test_file is not None:
-    train_data, test_data = load_data(uploaded_train_file, uploaded_test_file)
-    train_processed, test_processed = preprocess_data(train_data, test_data)
-    model, X_test, y_test = train_model(train_processed)
+    data_key = dataset_key(uploaded_train_file, uploaded_test_file, imputer=imputer, partitioned=partitioned)
+    pipeline = run_pipeline(data_key, uploaded_train_file, uploaded_test_file, chunk_mb, csv_backend, append_aware,
+                            engine, partitioned, imputer, tuning, cross_validate, trainer)
+    if pipeline is None:
+        st.stop()
+    train_data, test_data = pipeline['train'], pipeline['test']
+    train_processed, test_processed = pipeline['train_processed'], pipeline['test_processed']
+    train_features, test_features = pipeline['train_features'], pipeline['test_features']
+    model, y_test, y_pred = pipeline['model'], pipeline['y_test'], pipeline['y_pred']
     
     # Create tabs
     tab1, tab2, tab3, tab4, tab5 = st.tabs([
@@ -116,6 +2360,25 @@ if uploaded_train_file is not None and uploaded_test_file is not None:
             
             st.subheader("Data Shapes")
             st.code(f"Training Data Shape: {train_data.shape}\nTesting Data Shape:  {test_data.shape}")
+            
+            st.subheader("Memory Usage")
+            memory_report = pipeline['memory_report']
+            st.code("\n".join(
+                f"{name.title()} Data: {report['bytes before'].sum() / 1024:,.1f} KB -> "
+                f"{report['bytes after'].sum() / 1024:,.1f} KB after downcasting"
+                for name, report in memory_report.items()))
+            st.dataframe(memory_report['train'], height=210)
+            
+            st.subheader("Data Validation")
+            train_quarantine, test_quarantine = pipeline['train_quarantine'], pipeline['test_quarantine']
+            if len(train_quarantine) + len(test_quarantine) == 0:
+                st.success("All rows passed validation.")
+            else:
+                st.warning(f"Quarantined {len(train_quarantine)} training and {len(test_quarantine)} test rows.")
+                st.dataframe(pd.DataFrame({'Train': rule_counts(train_quarantine),
+                                           'Test': rule_counts(test_quarantine)}).fillna(0).astype(int))
+                with st.expander("Quarantined rows"):
+                    st.dataframe(pd.concat([train_quarantine, test_quarantine], keys=['train', 'test']))
 
         with col2:
             st.subheader("Raw Test Data")
@@ -143,20 +2406,59 @@ if uploaded_train_file is not None and uploaded_test_file is not None:
         st.header("Data Preprocessing")
         st.image("Screenshot_253.png")
         st.subheader("Handling Missing Values")
-        st.markdown("""
-        - **Age**: Imputed with the mean age from the training set.
-        - **Fare**: Imputed with the median fare from the training set.
-        """)
+        imputation_report = pipeline['imputation_report']
+        if imputation_report is None:
+            st.markdown("""
+            - **Age**: Imputed with the median training age of the passenger's class, sex and title; passengers
+              whose group has no known age get the mean age from the training set.
+            - **Fare**: Imputed with the median fare from the training set.
+            """)
+            learned_age_medians = pipeline['preprocessor'].age_group_medians_
+            if learned_age_medians is not None:
+                with st.expander(f"Learned Age medians ({len(learned_age_medians)} groups)"):
+                    st.dataframe(learned_age_medians.rename('Median Age').reset_index())
+        else:
+            st.markdown(f"""
+            - **Age** and **Fare**: Imputed with the mean of the {KNN_NEIGHBORS} nearest training passengers with
+              both known, by class, sex, siblings/spouses, parents/children and the other of Age/Fare (standardized).
+            """)
+            st.write("The neighbours come from a KD-tree over the complete training rows (a uniform sample of at most "
+                     f"{KNN_INDEX_ROWS:,}), queried in batches of {KNN_QUERY_BATCH_ROWS:,} rows:")
+            st.dataframe(imputation_report.style.format({'index rows': '{:,.0f}', 'queried rows': '{:,.0f}',
+                                                         'build (s)': '{:.3f}', 'query (s)': '{:.3f}'}))
+        statistics = pipeline['statistics']
+        st.write(f"Streaming statistics (mergeable, computed per {STATS_CHUNK_ROWS:,}-row chunk) vs. exact:")
+        st.code(f"Age mean:    {statistics['age_mean'][0]:.4f} (exact {statistics['age_mean'][1]:.4f})\n"
+                f"Fare median: {statistics['fare_median'][0]:.4f} (exact {statistics['fare_median'][1]:.4f})\n"
+                f"  rank error {statistics['observed_rank_error']:.4%}, "
+                f"guaranteed <= {statistics['rank_error_bound']:.4%}")
         
         st.image("Screenshot_248.png") # Image from notebook
         
         st.image("Screenshot_254.png")
         st.subheader("Converting Categorical Data")
-        st.markdown("- **Sex**: Mapped 'female' to `0` and 'male' to `1`.")
+        st.markdown("""
+        - **Sex**: Mapped 'female' to `0` and 'male' to `1`.
+        - **Embarked**: One-hot encoded against the ports seen in the training set; unseen or missing ports get all zeros.
+        """)
         
         st.image("Screenshot_254.png")
-        st.subheader("Dropping Unnecessary Columns")
-        st.markdown("- Removed 'Name', 'Ticket', 'Cabin', and 'Embarked'.")
+        st.subheader("Feature Engineering")
+        st.markdown(f"""
+        - **Title**: Extracted from 'Name' ('Braund, Mr. Owen' becomes `Mr`; Mlle/Ms count as Miss, Mme as Mrs).
+        - **Deck**: The first letter of 'Cabin'.
+        - **TicketPrefix**: The non-numeric part of 'Ticket', normalized ('A/5 21171' becomes `A5`).
+        - **TicketGroupSize**: How many training passengers share the ticket (1 for unseen tickets).
+        - **FamilySize**: `SibSp + Parch + 1`.
+        - Title, Deck and TicketPrefix are one-hot encoded; values seen fewer than {MIN_CATEGORY_COUNT} times in training count as unknown.
+        """)
+        st.write("'Name' and 'Cabin' are reduced to these categoricals right after parsing; any other columns are "
+                 "projected away at ingestion, so they are never parsed into memory.")
+        for name, report in zip(["train", "test"], pipeline['projection']):
+            if report is not None:
+                st.code(f"{name}: skipped {report['skipped_columns']}\n"
+                        f"  ~{report['bytes_saved'] / 1024 ** 2:.2f} MB and "
+                        f"~{report['ms_saved']:.1f} ms saved (estimated from a {PROJECTION_SAMPLE_ROWS:,}-row sample)")
         
         st.image("Screenshot_254.png")
         st.subheader("Data After Preprocessing")
@@ -166,11 +2468,11 @@ if uploaded_train_file is not None and uploaded_test_file is not None:
         st.subheader("Correlation After Preprocessing")
         st.write("This heatmap shows the correlations *after* cleaning and converting data. 'Sex' (now numeric) shows the strongest correlation with 'Survived'.")
         
-        X_corr = train_processed.drop(columns=['Survived', 'PassengerId'])
-        corr = X_corr.corr()
+        # Computed once per dataset, chunk by chunk from the shared matrix (see `feature_correlation`).
+        corr = pipeline['correlation']
         
-        fig_corr, ax_corr = plt.subplots(figsize=(10, 6))
-        sns.heatmap(corr, annot=True, ax=ax_corr, cmap='coolwarm', fmt='.2f')
+        fig_corr, ax_corr = plt.subplots(figsize=(14, 10))
+        sns.heatmap(corr, annot=True, ax=ax_corr, cmap='coolwarm', fmt='.2f', annot_kws={'size': 6})
         ax_corr.set_title("Post-Preprocessing Correlation Heatmap")
         st.pyplot(fig_corr)
 
@@ -185,26 +2487,71 @@ if uploaded_train_file is not None and uploaded_test_file is not None:
         
         st.code(f"""
 # Features (X)
-{list(X_test.columns)}
+{train_features.columns}
 
 # Target (y)
 ['Survived']
 
 # Model
-model = LogisticRegression(max_iter=1000)
+model = {model!r}
 model.fit(X_train_full, y_train_full)
         """)
-        st.success("Model trained successfully!")
+        registry_report = pipeline['registry']
+        if registry_report['loaded']:
+            st.success(f"Model loaded from the registry in {registry_report['seconds'] * 1000:.1f} ms "
+                       f"(trained {registry_report['trained at']} in {registry_report['training seconds']:.2f}s).")
+        else:
+            st.success("Model trained successfully!")
+        training_report = pipeline['training_report']
+        if training_report is not None and training_report['warm']:
+            st.write("This upload appends rows to an earlier one, so the fit started from that lineage's last coefficients:")
+            st.code(f"Warm fit: {training_report['iterations']} iterations in {training_report['seconds']:.3f}s "
+                    f"({training_report['rows']:,} rows)\n"
+                    f"Cold fit: {training_report['cold iterations']} iterations in "
+                    f"~{training_report['cold seconds']:.3f}s (the lineage's last cold fit, on "
+                    f"{training_report['cold rows']:,} rows, time scaled to these rows)\n"
+                    f"Saved:    {training_report['iterations saved']} iterations, "
+                    f"{training_report['seconds saved']:.3f}s")
+        elif training_report is not None:
+            st.write(f"Trained cold in {training_report['iterations']} iterations "
+                     f"({training_report['seconds']:.3f}s); refits of appended uploads will start from these coefficients.")
+
+        streaming_report = pipeline['streaming']
+        if streaming_report is not None:
+            resumed = streaming_report['resumed from epoch']
+            st.write(f"Trained out of core by SGD (log loss) over {streaming_report['chunks per epoch']} chunks of up to "
+                     f"{streaming_report['chunk rows']:,} rows read from disk, {streaming_report['epochs']} epochs in "
+                     f"{streaming_report['seconds']:.2f}s" + (f" (resumed from the epoch {resumed} checkpoint)." if resumed else "."))
+            st.line_chart(pd.Series(streaming_report['epoch accuracy'], name='Held-out accuracy',
+                                    index=pd.RangeIndex(1, len(streaming_report['epoch accuracy']) + 1, name='epoch')))
+            in_memory_accuracy = streaming_report.get('in-memory accuracy')
+            st.code(f"Streaming SGD:                 {streaming_report['accuracy']:.2%}\n"
+                    "In-memory LogisticRegression:  "
+                    + ("(matrix too large to compare)" if in_memory_accuracy is None else f"{in_memory_accuracy:.2%}")
+                    + "\n(accuracy on the same 30% held-out split)")
+
+        tuning = pipeline['tuning']
+        if tuning is not None:
+            st.subheader("Hyperparameter Leaderboard")
+            st.write(f"Successive halving with {TUNING_FOLDS}-fold cross-validated accuracy: each round keeps the best "
+                     f"1/{TUNING_FACTOR} of the candidates and gives them {TUNING_FACTOR}x the rows. "
+                     f"{tuning['trained fits']} fits trained and {tuning['cached fits']} reused from earlier searches "
+                     f"in {tuning['seconds']:.2f}s; the model above uses the top row.")
+            st.dataframe(tuning['leaderboard'].style.format({'accuracy': '{:.2%}', 'std': '{:.2%}', 'rows': '{:,}'}))
         
+        with st.expander("Model registry"):
+            st.write("Every fitted model, by dataset (content hash, pipeline version and imputer), trainer and "
+                     "hyperparameters. Uploads matching an entry load its coefficients and preprocessor instead of training.")
+            st.dataframe(model_registry().metadata().drop(columns=['columns'], errors='ignore'))
+
         st.image("Screenshot_254.png")
         st.header("Generate Predictions on Test Data")
         st.write("The trained model is now used to predict survival for the `test.csv` data.")
         
-        X_final_test = test_processed.drop(columns=['PassengerId'])
-        predictions = model.predict(X_final_test)
+        predictions = model.predict(test_features.X)
         
         submission_df = pd.DataFrame({
-            'PassengerId': test_processed['PassengerId'], 
+            'PassengerId': test_features.passenger_id, 
             'Survived': predictions
         })
         
@@ -217,31 +2564,67 @@ model.fit(X_train_full, y_train_full)
             file_name="titanic_survivors.csv",
             mime="text/csv",
         )
+        
+        st.subheader("Score Another Batch")
+        st.write("Passengers in any supported format are scored with the already fitted preprocessing and model; nothing is refit.")
+        batch_file = st.file_uploader("Upload passengers to score", type=upload_types, key="batch_file")
+        if batch_file is not None:
+            try:
+                batch_df = read_upload(batch_file, PIPELINE_COLUMNS, csv_backend)
+                batch_df, batch_quarantine = validate_frame(batch_df, False, batch_file.name)
+            except Exception as e:
+                st.error(f"Error loading batch: {e}")
+            else:
+                if len(batch_quarantine):
+                    st.warning(f"Skipped {len(batch_quarantine)} rows that failed validation.")
+                if batch_df.empty:
+                    st.warning("No rows left to score.")
+                else:
+                    batch_predictions = score_batch(model, pipeline['preprocessor'], batch_df)
+                    st.dataframe(batch_predictions.head())
+                    st.download_button(
+                        label="📥 Download Batch Predictions as CSV",
+                        data=convert_df_to_csv(batch_predictions),
+                        file_name="titanic_batch_predictions.csv",
+                        mime="text/csv",
+                    )
 
     # --- Tab 4: Model Evaluation ---
     with tab4:
         st.header("Evaluate the Model")
         st.image("Screenshot_253.png")
-        st.write("These metrics are calculated from a 70/30 train-test split of the *training data*.")
-        
-        y_pred = model.predict(X_test)
+        cv = pipeline['cv']
+        if cv is None:
+            st.write("These metrics are calculated from a 70/30 train-test split of the *training data*.")
+            y_true = y_test
+            metrics = {name: metric(y_true, y_pred) for name, metric in CV_METRICS.items()}
+            spreads = {}
+        else:
+            st.write(f"These metrics are the mean ± standard deviation over {CV_FOLDS} stratified folds of the "
+                     f"*training data* (folds fitted by {cv['workers']} worker process(es) in {cv['seconds']:.2f}s). "
+                     "The confusion matrix pools every row's out-of-fold prediction.")
+            y_true, y_pred = train_features.y, cv['predictions']
+            metrics, spreads = cv['folds'].mean().to_dict(), cv['folds'].std(ddof=0).to_dict()
         
         # Calculate metrics
-        accuracy = accuracy_score(y_test, y_pred)
-        precision = precision_score(y_test, y_pred)
-        recall = recall_score(y_test, y_pred)
-        f1 = f1_score(y_test, y_pred)
-        roc_auc = roc_auc_score(y_test, y_pred)
+        accuracy = metrics['Accuracy']
+        precision = metrics['Precision']
+        recall = metrics['Recall']
+        f1 = metrics['F1 Score']
+        roc_auc = metrics['ROC-AUC Score']
         
         st.subheader("Performance Metrics")
         st.image("Screenshot_254.png")
         
         col1, col2, col3 = st.columns(3)
-        col1.metric("Accuracy", f"{accuracy:.2%}")
-        col2.metric("Precision", f"{precision:.2%}")
-        col3.metric("Recall", f"{recall:.2%}")
-        col1.metric("F1 Score", f"{f1:.2f}")
-        col2.metric("ROC-AUC Score", f"{roc_auc:.2f}")
+        col1.metric("Accuracy", format_metric(accuracy, spreads.get('Accuracy')))
+        col2.metric("Precision", format_metric(precision, spreads.get('Precision')))
+        col3.metric("Recall", format_metric(recall, spreads.get('Recall')))
+        col1.metric("F1 Score", format_metric(f1, spreads.get('F1 Score'), '.2f'))
+        col2.metric("ROC-AUC Score", format_metric(roc_auc, spreads.get('ROC-AUC Score'), '.2f'))
+        if cv is not None:
+            with st.expander("Per-fold metrics"):
+                st.dataframe(cv['folds'].style.format('{:.4f}'))
         
         st.image("Screenshot_254.png")
         st.subheader("Confusion Matrix")
@@ -250,7 +2633,7 @@ model.fit(X_train_full, y_train_full)
         st.image("confusion_matrix.png")
         
         # Display the seaborn heatmap
-        conf_matrix = confusion_matrix(y_test, y_pred)
+        conf_matrix = confusion_matrix(y_true, y_pred)
         fig_cm, ax_cm = plt.subplots(figsize=(8, 6))
         sns.heatmap(conf_matrix/np.sum(conf_matrix), annot=True, fmt='.2%', cmap='Blues', ax=ax_cm)
         ax_cm.set_xlabel("Predicted Label")
@@ -297,7 +2680,7 @@ model.fit(X_train_full, y_train_full)
         
         st.image("Screenshot_254.png", width=300)
         
-        conf_matrix = confusion_matrix(y_test, y_pred) # Recalculate just in case for this tab
+        conf_matrix = confusion_matrix(y_true, y_pred) # Recalculate just in case for this tab
         st.markdown(f"""
         ### Confusion Matrix Breakdown
         * **True Negatives (TN):** {conf_matrix[0, 0]} (Correctly predicted non-survivors)